@@ -16,7 +16,9 @@ def get_convergence(fitness, last_fitness):
 
 
 def create_analytics_data(generations, serializable_creatures,):
-    ''' Creates the necessary data for plots '''
+    ''' Creates the necessary data for plots. The creatures that the retention policy dropped
+    are skipped, so the median and the species of a compacted generation only count the
+    creatures that are still in memory, the column store has every creature '''
     medians = []
     convergence = []
     histogram = []
@@ -29,12 +31,10 @@ def create_analytics_data(generations, serializable_creatures,):
             convergence.append(get_convergence(fitness, last_fitness))
         last_fitness = generation[0]
 
-        median_index = (len(generation) - 1)//2
-        creature_id = generation[median_index]
-        creature = serializable_creatures[creature_id]
-        medians.append(creature['fitness'])
-        for creature_id in generation:
-            creature = serializable_creatures[creature_id]
+        # The generation is ranked, so the median is the middle creature that is still kept
+        kept = [serializable_creatures[i] for i in generation if i in serializable_creatures]
+        medians.append(kept[(len(kept) - 1)//2]['fitness'] if kept else float('nan'))
+        for creature in kept:
             creature = Creature(**creature)
             cspecies = creature.get_species()
             if cspecies not in species:
@@ -47,12 +47,35 @@ def create_analytics_data(generations, serializable_creatures,):
     return histogram, medians, species, convergence
 
 
-def show_analytics(generation_number, generations, serializable_creatures):
-    ''' Shows the analytcs using matplotlib '''
-    (histogram,
-     medians,
-     species,
-     convergence) = create_analytics_data(generations, serializable_creatures)
+def create_columnar_analytics_data(offsets, columns):
+    ''' Creates the same data as create_analytics_data from the columns of a column store '''
+    starts, sizes = offsets[:-1], np.diff(offsets)
+    fitness = np.asarray(columns['fitness'])
+
+    medians = fitness[starts + (sizes - 1)//2].tolist()
+    # Like create_analytics_data, the convergence uses the first identity of each generation
+    first = np.asarray(columns['identity'])[starts].astype(np.float64)
+    convergence = np.abs((FITNESS_OPTIMAL - first[1:])/(FITNESS_OPTIMAL - first[:-1])).tolist()
+
+    vertices = np.asarray(columns['vertices']).astype(np.int64)
+    cells = vertices*len(sizes) + np.repeat(np.arange(len(sizes)), sizes)
+    table = np.bincount(cells, minlength=(vertices.max(initial=0) + 1)*len(sizes))
+    table = table.reshape(-1, len(sizes))
+    # Species are ordered by their first appearance like in create_analytics_data
+    counts = sorted(np.flatnonzero(table.any(axis=1)), key=lambda n: np.argmax(vertices == n))
+    species = {f'V{n}': table[n].tolist() for n in counts}
+
+    histogram = fitness[offsets[-2]:offsets[-1]].astype(int).tolist()
+    return histogram, medians, species, convergence
+
+
+def show_analytics(generation_number, generations, serializable_creatures, columns=None):
+    ''' Shows the analytcs using matplotlib, reading the data from a column store when given '''
+    if columns is None:
+        data = create_analytics_data(generations, serializable_creatures)
+    else:
+        data = create_columnar_analytics_data(*columns.read())
+    histogram, medians, species, convergence = data
     fig = plt.figure()
 
     fig.canvas.set_window_title('Analytics')
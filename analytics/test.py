@@ -1,9 +1,11 @@
 "Module to perform unittest"
+import os
+import tempfile
 import unittest
 
-from file import load_generations
+from file import load_generations, ColumnStore, write_columns
 
-from . import show_analytics
+from . import show_analytics, create_analytics_data, create_columnar_analytics_data
 
 
 class FileTestCase(unittest.TestCase):
@@ -14,6 +16,33 @@ class FileTestCase(unittest.TestCase):
         data = load_generations('test_data/default.pickle')
         show_analytics('Test', data['generations'], data['creatures'])
 
+    def test_columnar_analytics(self):
+        ''' Tests that the column store gives the same analytics as the creature dicts '''
+        data = load_generations('test_data/default.pickle')
+        with tempfile.TemporaryDirectory() as directory:
+            directory = os.path.join(directory, 'default.columns')
+            write_columns(ColumnStore(directory), data['generations'], data['creatures'])
+            store = ColumnStore(directory)
+            self.assertEqual(len(store), len(data['generations']))
+            self.assertEqual(create_columnar_analytics_data(*store.read()),
+                             create_analytics_data(data['generations'], data['creatures']))
+
+    def test_compacted_analytics(self):
+        ''' Tests that the creatures dropped from memory are skipped '''
+        data = load_generations('test_data/default.pickle')
+        generations, creatures = data['generations'], data['creatures']
+        # The last generation is always retained
+        dropped = [i for i in generations[0] if i not in generations[-1]][:3]
+        kept = {i: creatures[i] for i in creatures if i not in dropped}
+        _, medians, species, _ = create_analytics_data(generations, kept)
+        _, full_medians, full_species, _ = create_analytics_data(generations, creatures)
+        remaining = [kept[i] for i in generations[0] if i in kept]
+        self.assertEqual(medians[0], remaining[(len(remaining) - 1)//2]['fitness'])
+        self.assertEqual(len(remaining), len(generations[0]) - 3)
+        self.assertEqual(sum(counts[0] for counts in species.values()), len(remaining))
+        self.assertEqual(sum(counts[0] for counts in full_species.values()),
+                         len(generations[0]))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,244 @@
+''' Script to benchmark the performance of the simulator '''
+import random
+import sys
+import tempfile
+from argparse import ArgumentParser
+from timeit import default_timer, timeit
+
+import numpy as np
+
+from creature import Creature, find_adjacent_edges
+from file import load_generations, ColumnStore
+from analytics import create_columnar_analytics_data
+from population import Population
+from reproduction import reproduce, GenomeIndex
+from selection import select, SCHEMES
+from simulation import Simulation, PHYSICS, create_creature_bodies, find_mismatches
+from simulation.fixtures import get_fixture
+from settings import (
+    POPULATION_SIZE, MIN_VERTICES_COUNT, MAX_VERTICES_COUNT, MAX_SIZE, SIMULATION_MODE,
+    FIDELITY_PROFILES)
+
+
+def create_population(size=POPULATION_SIZE, seed=0):
+    ''' Returns a reproducible population of random creatures '''
+    rng = random.Random(seed)
+    return [Creature(n=rng.randint(MIN_VERTICES_COUNT, MAX_VERTICES_COUNT), size=MAX_SIZE, rng=rng)
+            for _ in range(size)]
+
+
+def create_kwargs_bodies(world, creatures, physics=PHYSICS):
+    ''' Creates the creature bodies like create_creature_bodies did before the joint definition
+    was reused, building the definition of every joint from keyword arguments '''
+    thickness, density, friction, motor_speed, max_motor_torque = physics
+    for creature in creatures:
+        body = {}
+        for edge in creature.edges:
+            vertex = creature.vertices[edge[0]], creature.vertices[edge[1]]
+            fixture = get_fixture(*vertex, thickness, density, friction)
+            body[tuple(edge)] = world.CreateDynamicBody(fixtures=fixture)
+
+        for edge in creature.edges:
+            for a_edge in find_adjacent_edges(edge, creature.edges):
+                anchor = int(creature.vertices[edge[0]][0]), int(creature.vertices[edge[0]][1])
+                world.CreateRevoluteJoint(
+                    bodyA=body[tuple(edge)],
+                    bodyB=body[tuple(a_edge)],
+                    anchor=anchor,
+                    collideConnected=True,
+                    motorSpeed=motor_speed,
+                    maxMotorTorque=max_motor_torque,
+                    enableMotor=True,
+                )
+
+
+def benchmark_turnover(repeat=5):
+    ''' Measures the cost of replacing the bodies of one generation with the next '''
+    creatures = create_population()
+    simulation = Simulation(workers=1)
+
+    def destroy_bodies():
+        for body in simulation.world.bodies:
+            if body != simulation.floor:
+                simulation.world.DestroyBody(body)
+
+    build = timeit(lambda: create_creature_bodies(simulation.world, creatures), number=1)
+    destroy = timeit(destroy_bodies, number=1)
+    for _ in range(repeat - 1):
+        build += timeit(lambda: create_creature_bodies(simulation.world, creatures), number=1)
+        destroy += timeit(destroy_bodies, number=1)
+
+    reset = 0
+    for _ in range(repeat):
+        create_creature_bodies(simulation.world, creatures)
+        reset += timeit(simulation.reset_world, number=1)
+
+    kwargs_build = 0
+    for _ in range(repeat):
+        kwargs_build += timeit(lambda: create_kwargs_bodies(simulation.world, creatures), number=1)
+        simulation.reset_world()
+
+    print(f'Generation turnover of {len(creatures)} creatures, mean of {repeat} runs')
+    print(f'Creating bodies and joints of keyword arguments: {kwargs_build / repeat:.3f}s')
+    print(f'Creating bodies and joints of a reused definition: {build / repeat:.3f}s')
+    print(f'Destroying bodies one by one: {destroy / repeat:.3f}s')
+    print(f'Resetting to an empty world: {reset / repeat:.3f}s')
+
+
+def load_population(file_path='test_data/default.pickle'):
+    ''' Returns the last generation of a generations file with its fitness cleared '''
+    data = load_generations(file_path)
+    creatures = []
+    for creature_id in data['generations'][-1]:
+        creature = Creature(**data['creatures'][creature_id])
+        creature.fitness = 0.0
+        creatures.append(creature)
+    return creatures
+
+
+def get_rank_correlation(fitness, reference):
+    ''' Returns the spearman rank correlation of two fitness dicts '''
+    identities = list(reference)
+    ranks = [np.argsort(np.argsort([values[identity] for identity in identities]))
+             for values in (fitness, reference)]
+    return np.corrcoef(*ranks)[0, 1]
+
+
+def benchmark_fidelity(mode, file_path='test_data/default.pickle'):
+    ''' Measures the step throughput of every fidelity profile and its rank correlation of
+    fitness with the precise profile '''
+    creatures = load_population(file_path)
+    results = {}
+    for fidelity in FIDELITY_PROFILES:
+        simulation = Simulation(1, None, mode, racing=False, rest_detection=False,
+                                fidelity=fidelity)
+        start = default_timer()
+        fitness = simulation.simulate_local(creatures, show_progress=False)
+        elapsed = default_timer() - start
+        results[fidelity] = fitness, len(creatures) * simulation.step_limit / elapsed, elapsed
+
+    print(f'Fidelity of {len(creatures)} creatures of {file_path} in {mode} mode')
+    for fidelity, (fitness, throughput, elapsed) in results.items():
+        correlation = get_rank_correlation(fitness, results['precise'][0])
+        print(f'{fidelity:>10}: {elapsed:7.2f}s, {throughput:8.0f} creature steps/s, '
+              f'rank correlation with precise {correlation:.3f}')
+
+
+def benchmark_analytics(generations=5000, size=POPULATION_SIZE, seed=0):
+    ''' Measures the analytics of a column store with random generations '''
+    rng = np.random.default_rng(seed)
+    with tempfile.TemporaryDirectory() as directory:
+        store = ColumnStore(directory)
+        for i in range(generations):
+            store.write({
+                'identity': np.arange(i*size, (i + 1)*size),
+                'fitness': np.sort(rng.normal(50, 20, size))[::-1],
+                'vertices': rng.integers(MIN_VERTICES_COUNT, MAX_VERTICES_COUNT + 1, size),
+                'edges': rng.integers(MIN_VERTICES_COUNT, 2*MAX_VERTICES_COUNT, size),
+                'parent': np.arange(i*size, (i + 1)*size) - size,
+            })
+        start = default_timer()
+        create_columnar_analytics_data(*ColumnStore(directory).read())
+        elapsed = default_timer() - start
+    print(f'Analytics of {generations} generations of {size} creatures: {elapsed:.3f}s')
+
+
+def create_lineage(depth, seed=0):
+    ''' Returns the data of a chain of creatures where each one is the offspring of the previous '''
+    rng = random.Random(seed)
+    creature = Creature(n=MAX_VERTICES_COUNT, size=MAX_SIZE, rng=rng)
+    creatures = {creature.identity: creature.get_data()}
+    for _ in range(depth - 1):
+        creature = reproduce(creature, creatures, rng)
+        creatures[creature.identity] = creature.get_data()
+    return creature, creatures
+
+
+def benchmark_reproduce(depths=(10, 100, 1000, 5000), repeat=200):
+    ''' Measures the reproduction time of a creature at different depths of its lineage '''
+    print(f'Mean time of {repeat} reproductions of the last creature of a lineage')
+    for depth in depths:
+        creature, creatures = create_lineage(depth)
+        genomes = GenomeIndex(creatures.values())
+        rng = random.Random(0)
+        walk = timeit(lambda: reproduce(creature, creatures, rng), number=repeat)
+        index = timeit(lambda: reproduce(creature, creatures, rng, genomes), number=repeat)
+        print(f'Depth {depth:>5}: ancestor walk {walk / repeat * 1e6:8.1f}us, '
+              f'genome index {index / repeat * 1e6:6.1f}us')
+
+
+def benchmark_mutation(size=100000, seed=0):
+    ''' Compares reproducing a population one creature at a time with breeding it in one batch,
+    from the population columns to the offspring columns, without and with the genome index '''
+    population = Population.create_random(size, MAX_SIZE, MIN_VERTICES_COUNT, MAX_VERTICES_COUNT,
+                                          random.Random(seed))
+    creatures = {data['identity']: data for data in map(population.get_data, range(size))}
+    genomes = GenomeIndex(creatures.values())
+    sample = population[:size // 100].get_creatures()
+    rng = random.Random(seed)
+    start = default_timer()
+    for creature in sample:
+        reproduce(creature, creatures, rng, genomes)
+    single = (default_timer() - start) * 100
+    plain = timeit(lambda: population.breed(1, random.Random(seed)), number=1)
+    index = timeit(lambda: population.breed(1, random.Random(seed), genomes), number=1)
+    print(f'Reproducing {size} creatures one at a time with the index (estimated): {single:.3f}s')
+    print(f'Breeding {size} creatures in one batch: {plain:.3f}s')
+    print(f'Breeding {size} creatures in one batch with the index: {index:.3f}s')
+
+
+def benchmark_selection(sizes=(10000, 100000), ratio=0.4, seed=0):
+    ''' Measures every selection scheme on large populations '''
+    for size in sizes:
+        fitness = np.random.default_rng(seed).normal(50, 20, size)
+        count = int(size * ratio)
+        for scheme in SCHEMES:
+            elapsed = timeit(lambda: select(fitness, count, scheme, random.Random(seed)), number=1)
+            print(f'Selecting {count} of {size} creatures with {scheme} selection: {elapsed:.3f}s')
+
+
+def verify_equivalence(workers, mode, seed=0):
+    ''' Checks that one generation has bit-identical fitness serially and in parallel '''
+    creatures = create_population(seed=seed)
+    mismatches = find_mismatches(creatures, workers, mode)
+    if mismatches:
+        print(f'{len(mismatches)} of {len(creatures)} creatures differ: {mismatches}')
+        return False
+    print(f'Serial and {workers} workers fitness of {len(creatures)} creatures are identical')
+    return True
+
+
+def main():
+    ''' Main function of the script '''
+    parser = ArgumentParser(description='Script to benchmark the simulator')
+    parser.add_argument('benchmark', help='benchmark to run', choices=[
+        'turnover', 'verify', 'fidelity', 'analytics', 'reproduce', 'selection', 'mutation'])
+    parser.add_argument('--repeat', '-r', help='number of times to repeat', default=5)
+    parser.add_argument('--workers', '-w', help='number of worker processes to verify', default=4)
+    parser.add_argument('--mode', '-m', choices=['shared', 'isolated'], default=SIMULATION_MODE,
+                        help='simulation mode to verify')
+    parser.add_argument('--seed', '-s', help='seed of the verified population', default=0)
+    parser.add_argument('--load-path', '-l', help='generations data used by the fidelity benchmark',
+                        default='test_data/default.pickle')
+
+    args = parser.parse_args()
+
+    if args.benchmark == 'turnover':
+        benchmark_turnover(int(args.repeat))
+    elif args.benchmark == 'fidelity':
+        benchmark_fidelity(args.mode, args.load_path)
+    elif args.benchmark == 'mutation':
+        benchmark_mutation()
+    elif args.benchmark == 'selection':
+        benchmark_selection()
+    elif args.benchmark == 'reproduce':
+        benchmark_reproduce()
+    elif args.benchmark == 'analytics':
+        benchmark_analytics()
+    elif args.benchmark == 'verify':
+        if not verify_equivalence(int(args.workers), args.mode, int(args.seed)):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
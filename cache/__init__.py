@@ -0,0 +1,127 @@
+''' Module to cache the fitness of creatures by their genome '''
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+
+from settings import FITNESS_CACHE_SIZE, FITNESS_CACHE_COMPACTION
+
+
+def get_cache_key(vertices, edges, physics):
+    ''' Returns a canonical hash of a genome and the physics settings it was simulated with '''
+    # The order of the edges is kept since it decides the reference body of the creature
+    genome = (
+        tuple((int(x), int(y)) for x, y in vertices),
+        tuple((int(a), int(b)) for a, b in edges),
+        tuple(physics),
+    )
+    return hashlib.sha1(repr(genome).encode()).hexdigest()
+
+
+class FitnessCache:
+    ''' Least recently used fitness cache that is stored on disk, the file is a sequence of
+    pickled chunks of entries and the later chunks are the more recently used entries '''
+
+    def __init__(self, file_path, size=FITNESS_CACHE_SIZE):
+        self.file_path = file_path
+        self.size = size
+        self.entries = OrderedDict()
+        # Entries put or used since the last snapshot
+        self.added = OrderedDict()
+        # Entries in the file, including the repeated and evicted ones
+        self.records = 0
+        # Whether the file ends with a chunk that could not be read
+        self.damaged = False
+        self.hits = 0
+        self.misses = 0
+        if os.path.exists(file_path):
+            self.entries = self.read()
+
+    def read(self):
+        ''' Reads the entries stored on disk '''
+        entries = OrderedDict()
+        self.records = 0
+        self.damaged = False
+        size = os.path.getsize(self.file_path)
+        with open(self.file_path, 'rb') as file:
+            while file.tell() < size:
+                try:
+                    chunk = pickle.load(file)
+                except (EOFError, pickle.UnpicklingError, ValueError):
+                    # A chunk cut short by a crash, the next write rewrites the file without it
+                    self.damaged = True
+                    break
+                self.records += len(chunk)
+                for key, fitness in chunk.items():
+                    entries[key] = fitness
+                    entries.move_to_end(key)
+                while len(entries) > self.size:
+                    entries.popitem(last=False)
+        return entries
+
+    def get(self, key):
+        ''' Returns the cached fitness of a key or None '''
+        fitness = self.entries.get(key)
+        if fitness is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        self.added[key] = fitness
+        self.added.move_to_end(key)
+        return fitness
+
+    def put(self, key, fitness):
+        ''' Stores the fitness of a key and evicts the least recently used entries '''
+        self.entries[key] = float(fitness)
+        self.entries.move_to_end(key)
+        self.added[key] = float(fitness)
+        self.added.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def save(self):
+        ''' Writes the entries put or used since the last save '''
+        self.write(self.snapshot())
+
+    def snapshot(self):
+        ''' Returns the entries put or used since the last snapshot, they can be written while the
+        cache keeps changing '''
+        added, self.added = self.added, OrderedDict()
+        return added
+
+    def write(self, entries):
+        ''' Appends a chunk of entries to the file, once the file holds FITNESS_CACHE_COMPACTION
+        times the size of the cache it is rewritten atomically with only the live entries '''
+        if not entries:
+            return
+        directory = os.path.dirname(self.file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if not self.damaged and self.records + len(entries) <= self.size * FITNESS_CACHE_COMPACTION:
+            with open(self.file_path, 'ab') as file:
+                pickle.dump(entries, file)
+                file.flush()
+                os.fsync(file.fileno())
+            self.records += len(entries)
+            return
+
+        # The entries that other processes appended are kept
+        merged = self.read() if os.path.exists(self.file_path) else OrderedDict()
+        for key, fitness in entries.items():
+            merged[key] = fitness
+            merged.move_to_end(key)
+        while len(merged) > self.size:
+            merged.popitem(last=False)
+
+        temp_path = f'{self.file_path}.tmp'
+        with open(temp_path, 'wb') as file:
+            pickle.dump(merged, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.file_path)
+        self.records = len(merged)
+        self.damaged = False
+
+    def __len__(self):
+        return len(self.entries)
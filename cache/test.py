@@ -0,0 +1,69 @@
+"Module to perform unittest"
+import os
+import tempfile
+import unittest
+
+from . import FitnessCache, get_cache_key
+
+
+class CacheTestCase(unittest.TestCase):
+    "Class that contains test cases for cache package"
+
+    def test_cache_key(self):
+        ''' Tests that the key is canonical and depends on the physics settings '''
+        key = get_cache_key([(0, 0), (1, 2)], [(0, 1)], (60, 8, 3))
+        self.assertEqual(key, get_cache_key([[0, 0], [1, 2]], [[0, 1]], [60, 8, 3]))
+        self.assertNotEqual(key, get_cache_key([(0, 0), (1, 2)], [(0, 1)], (30, 8, 3)))
+
+    def test_eviction_and_persistence(self):
+        ''' Tests the size bounded eviction and reloading from disk '''
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, 'cache.pickle')
+            cache = FitnessCache(file_path, size=2)
+            cache.put('a', 1.0)
+            cache.put('b', 2.0)
+            self.assertEqual(cache.get('a'), 1.0)
+            cache.put('c', 3.0)
+            self.assertIsNone(cache.get('b'))
+            cache.save()
+
+            cache = FitnessCache(file_path, size=2)
+            self.assertEqual(cache.get('a'), 1.0)
+            self.assertEqual(cache.get('c'), 3.0)
+
+    def test_append_and_compaction(self):
+        ''' Tests that saves append the new entries and that the file is compacted '''
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, 'cache.pickle')
+            cache = FitnessCache(file_path, size=3)
+            cache.put('a', 1.0)
+            cache.put('b', 2.0)
+            cache.save()
+            size = os.path.getsize(file_path)
+            cache.put('c', 3.0)
+            cache.save()
+            self.assertGreater(os.path.getsize(file_path), size)
+            self.assertEqual(FitnessCache(file_path, size=3).records, 3)
+
+            for i in range(4):
+                cache.put(str(i), float(i))
+                cache.save()
+            self.assertLessEqual(cache.records, 6)
+            self.assertEqual(list(FitnessCache(file_path, size=3).entries), ['1', '2', '3'])
+
+            cache.put('e', 5.0)
+            self.assertEqual(list(cache.snapshot()), ['e'])
+            self.assertEqual(len(cache.snapshot()), 0)
+
+            # A chunk cut short by a crash is dropped by the next write
+            with open(file_path, 'ab') as file:
+                file.write(b'\x80\x04\x95')
+            cache = FitnessCache(file_path, size=3)
+            self.assertTrue(cache.damaged)
+            cache.put('d', 4.0)
+            cache.save()
+            self.assertEqual(list(FitnessCache(file_path, size=3).entries), ['2', '3', 'd'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+''' Module of the validated settings of a training run, loaded from a preset, a file and options '''
+import json
+
+from file import STORAGE_EXTENSIONS
+from selection import SCHEMES
+from settings import (
+    POPULATION_SIZE, SELECTION_SIZE, OFFSPRINGS_PER_SELECTION_SIZE, RANDOM_NEW_POPULATION_SIZE,
+    SELECTION, K_COUNT, STEP_LIMIT, MOTOR_SPEED, MAX_MOTOR_TORQUE, DENSITY, FRICTION, FIDELITY,
+    FIDELITY_PROFILES, WORKERS, SIMULATION_MODE, RACING, RACING_CHECKPOINTS, RACING_SPEED_MARGIN,
+    RACING_STALL_DISTANCE, REST_DETECTION, REST_INTERVAL, REST_WINDOW, REST_DISTANCE,
+    MULTI_FIDELITY, SCREENING_FIDELITY, SCREENING_STEP_LIMIT, SCREENING_PERCENTILE, STORAGE,
+    RUN_PRESETS)
+
+# Settings that a run can change, the other settings of settings.py are the same for every run
+DEFAULTS = {
+    'population_size': POPULATION_SIZE,
+    'selection_size': SELECTION_SIZE,
+    'offsprings_per_selection_size': OFFSPRINGS_PER_SELECTION_SIZE,
+    'random_new_population_size': RANDOM_NEW_POPULATION_SIZE,
+    'selection': SELECTION,
+    'k_count': K_COUNT,
+    'step_limit': STEP_LIMIT,
+    'motor_speed': MOTOR_SPEED,
+    'max_motor_torque': MAX_MOTOR_TORQUE,
+    'density': DENSITY,
+    'friction': FRICTION,
+    'fidelity': FIDELITY,
+    'workers': WORKERS,
+    'simulation_mode': SIMULATION_MODE,
+    'racing': RACING,
+    'racing_checkpoints': RACING_CHECKPOINTS,
+    'racing_speed_margin': RACING_SPEED_MARGIN,
+    'racing_stall_distance': RACING_STALL_DISTANCE,
+    'rest_detection': REST_DETECTION,
+    'rest_interval': REST_INTERVAL,
+    'rest_window': REST_WINDOW,
+    'rest_distance': REST_DISTANCE,
+    'multi_fidelity': MULTI_FIDELITY,
+    'screening_fidelity': SCREENING_FIDELITY,
+    'screening_step_limit': SCREENING_STEP_LIMIT,
+    'screening_percentile': SCREENING_PERCENTILE,
+    'storage': STORAGE,
+}
+CHOICES = {
+    'selection': list(SCHEMES),
+    'fidelity': list(FIDELITY_PROFILES),
+    'screening_fidelity': list(FIDELITY_PROFILES),
+    'simulation_mode': ['shared', 'isolated'],
+    'storage': list(STORAGE_EXTENSIONS),
+}
+# Lowest value of the integer settings
+MINIMUMS = {
+    'population_size': 1,
+    'selection_size': 1,
+    'offsprings_per_selection_size': 0,
+    'random_new_population_size': 0,
+    'k_count': 1,
+    'step_limit': 1,
+    'workers': 1,
+    'screening_step_limit': 1,
+    'rest_interval': 1,
+    'rest_window': 1,
+}
+# Settings that are numbers even when their default is an integer
+FLOATS = {'motor_speed', 'max_motor_torque', 'density', 'friction', 'screening_percentile',
+          'racing_speed_margin', 'racing_stall_distance', 'rest_distance'}
+# Short flags of the options that cui.py had before the run settings
+FLAGS = {
+    'workers': ['-w'],
+    'simulation_mode': ['--mode', '-m'],
+    'fidelity': ['-f'],
+}
+
+
+class RunConfig:
+    ''' Settings of a training run that are checked when it is created, the subsystems take
+    them from this object instead of importing them from settings.py '''
+
+    def __init__(self, **values):
+        unknown = sorted(set(values) - set(DEFAULTS))
+        if unknown:
+            raise ValueError(f'Unknown run settings: {", ".join(unknown)}')
+        for name, default in DEFAULTS.items():
+            value = values.get(name, default)
+            # JSON files give lists
+            setattr(self, name, tuple(value) if isinstance(value, list) else value)
+        self.validate()
+
+    def validate(self):
+        ''' Raises a ValueError with every setting that has a wrong type or value '''
+        errors = []
+        for name, default in DEFAULTS.items():
+            value = getattr(self, name)
+            if isinstance(default, bool):
+                if not isinstance(value, bool):
+                    errors.append(f'{name} must be true or false')
+            elif isinstance(default, tuple):
+                if not isinstance(value, tuple) or not all(
+                        isinstance(v, int) and not isinstance(v, bool) and v > 0 for v in value):
+                    errors.append(f'{name} must be a list of positive integers')
+            elif name in CHOICES:
+                if value not in CHOICES[name]:
+                    errors.append(f'{name} must be one of {", ".join(CHOICES[name])}')
+            elif name in MINIMUMS:
+                if not isinstance(value, int) or isinstance(value, bool) or value < MINIMUMS[name]:
+                    errors.append(f'{name} must be an integer of at least {MINIMUMS[name]}')
+            elif not isinstance(value, (int, float)) or isinstance(value, bool):
+                errors.append(f'{name} must be a number')
+        if errors:
+            raise ValueError('Invalid run settings: ' + '; '.join(errors))
+
+        # The selected creatures are kept next to their offsprings
+        size = (self.selection_size * (self.offsprings_per_selection_size + 1)
+                + self.random_new_population_size)
+        if size != self.population_size:
+            errors.append(f'population_size is {self.population_size} but selection_size * '
+                          f'(offsprings_per_selection_size + 1) + random_new_population_size '
+                          f'is {size}')
+        if self.k_count >= self.population_size:
+            errors.append('k_count must be lower than population_size')
+        if not 0 <= self.screening_percentile <= 100:
+            errors.append('screening_percentile must be between 0 and 100')
+        if errors:
+            raise ValueError('Invalid run settings: ' + '; '.join(errors))
+
+    def get_data(self):
+        ''' Returns the settings as a dict that can be saved as JSON '''
+        return {name: getattr(self, name) for name in DEFAULTS}
+
+    def __eq__(self, other):
+        return isinstance(other, RunConfig) and self.get_data() == other.get_data()
+
+    def __repr__(self):
+        return f'RunConfig({self.get_data()})'
+
+
+def load_config(file_path=None, preset=None, **values):
+    ''' Returns the settings of a preset overridden by the ones of a JSON file and then by the
+    values. The file can name its preset, the preset argument takes precedence over it '''
+    file_values = {}
+    if file_path is not None:
+        with open(file_path, encoding='utf-8') as file:
+            file_values = json.load(file)
+    file_preset = file_values.pop('preset', 'default')
+    preset = file_preset if preset is None else preset
+    if preset not in RUN_PRESETS:
+        raise ValueError(f'Unknown run preset {preset}, it must be one of '
+                         f'{", ".join(RUN_PRESETS)}')
+    return RunConfig(**{**RUN_PRESETS[preset], **file_values, **values})
+
+
+def add_arguments(parser):
+    ''' Adds the options of the run settings to an argument parser, the options that are not
+    given stay None so they do not override the preset and the file '''
+    parser.add_argument('--config', '-c', help='JSON file of run settings')
+    parser.add_argument('--preset', '-p', choices=list(RUN_PRESETS),
+                        help='run settings that the file and the options override')
+    for name, default in DEFAULTS.items():
+        flags = ['--' + name.replace('_', '-')] + FLAGS.get(name, [])
+        if isinstance(default, bool):
+            parser.add_argument(*flags, dest=name, action='store_true', default=None,
+                                help=f'turns the {name} setting on')
+            parser.add_argument('--no-' + name.replace('_', '-'), dest=name,
+                                action='store_false', default=None,
+                                help=f'turns the {name} setting off')
+        elif isinstance(default, tuple):
+            parser.add_argument(*flags, dest=name, type=int, nargs='+',
+                                help=f'sets the {name} setting')
+        else:
+            value_type = float if name in FLOATS else type(default)
+            parser.add_argument(*flags, dest=name, type=value_type, choices=CHOICES.get(name),
+                                help=f'sets the {name} setting')
+
+
+def get_config(args):
+    ''' Returns the run settings of the parsed options of add_arguments '''
+    values = {name: getattr(args, name) for name in DEFAULTS if getattr(args, name) is not None}
+    return load_config(args.config, args.preset, **values)
@@ -0,0 +1,76 @@
+"Module to perform unittest"
+import json
+import os
+import tempfile
+import unittest
+from argparse import ArgumentParser
+
+from settings import RUN_PRESETS
+from simulation import Simulation
+
+from . import RunConfig, load_config, add_arguments, get_config
+
+
+class ConfigTestCase(unittest.TestCase):
+    "Class that contains test cases for config package"
+
+    def test_validation(self):
+        ''' Tests that the presets are valid and that wrong settings are rejected '''
+        for preset in RUN_PRESETS:
+            config = load_config(preset=preset)
+            self.assertEqual(config.population_size, config.selection_size * (
+                config.offsprings_per_selection_size + 1) + config.random_new_population_size)
+        self.assertRaises(ValueError, RunConfig, population_size=10)
+        self.assertRaises(ValueError, RunConfig, unknown=1)
+        self.assertRaises(ValueError, RunConfig, selection='lottery')
+        self.assertRaises(ValueError, RunConfig, racing=1)
+        self.assertRaises(ValueError, RunConfig, workers=0)
+        self.assertRaises(ValueError, load_config, preset='huge')
+
+    def test_precedence(self):
+        ''' Tests that the file overrides its preset and that the options override both '''
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, 'run.json')
+            with open(file_path, 'w', encoding='utf-8') as file:
+                json.dump({'preset': 'small', 'step_limit': 300, 'selection': 'rank'}, file)
+
+            config = load_config(file_path)
+            self.assertEqual((config.population_size, config.step_limit, config.selection),
+                             (50, 300, 'rank'))
+
+            parser = ArgumentParser()
+            add_arguments(parser)
+            config = get_config(parser.parse_args(
+                ['-c', file_path, '--step-limit', '600', '--mode', 'isolated', '--racing',
+                 '--no-rest-detection', '--density', '2.5']))
+            self.assertEqual((config.population_size, config.step_limit, config.simulation_mode,
+                              config.racing, config.rest_detection, config.density),
+                             (50, 600, 'isolated', True, False, 2.5))
+            self.assertEqual(get_config(parser.parse_args(['-c', file_path])).rest_detection,
+                             load_config(file_path).rest_detection)
+            config = get_config(parser.parse_args(['-c', file_path, '-p', 'default']))
+            self.assertEqual((config.population_size, config.step_limit), (500, 300))
+        self.assertEqual(RunConfig(**RunConfig().get_data()), RunConfig())
+
+    def test_simulation_config(self):
+        ''' Tests that the physics of the run settings reach the simulation '''
+        default = Simulation.from_config(RunConfig())
+        heavy = Simulation.from_config(RunConfig(density=4, selection_size=100,
+                                                 random_new_population_size=300))
+        screening = Simulation.from_config(RunConfig(), screening=True)
+        self.assertEqual(default.get_physics(), Simulation().get_physics())
+        self.assertNotEqual(heavy.get_physics(), default.get_physics())
+        self.assertEqual(heavy.selection_size, 100)
+        self.assertLess(screening.step_limit, default.step_limit)
+
+        tuned = Simulation.from_config(RunConfig(racing_checkpoints=[60, 120], rest_interval=5,
+                                                 racing_speed_margin=1.5))
+        self.assertEqual(tuned.get_racing_settings(),
+                         ((60, 120), 1.5, default.racing_stall_distance))
+        self.assertEqual(tuned.get_rest_settings()[0], 5)
+        self.assertEqual(default.get_rest_settings(), Simulation().get_rest_settings())
+        self.assertRaises(ValueError, RunConfig, racing_checkpoints=[0, 60])
+
+
+if __name__ == "__main__":
+    unittest.main()
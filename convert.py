@@ -0,0 +1,18 @@
+''' Script to convert a generations pickle file to an append-only generations log '''
+from argparse import ArgumentParser
+
+from file import convert_generations
+
+
+def main():
+    ''' Main function of the script '''
+    parser = ArgumentParser(description='Script to convert a generations pickle file to a log')
+    parser.add_argument('file_path', help='generations pickle file to convert')
+
+    args = parser.parse_args()
+
+    print(f'Converted to {convert_generations(args.file_path)}')
+
+
+if __name__ == '__main__':
+    main()
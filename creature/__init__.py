@@ -1,10 +1,10 @@
 "Module to generate random connected graphs"
-import tkinter as tk
-from random import choice, randint, sample
+import random
 
-import cv2
 import numpy as np
 
+from .genome import Genome
+
 
 def get_all_possible_edges(n):
     ''' Returns all the possible edges for a given number of vertices '''
@@ -15,7 +15,7 @@ def get_all_possible_edges(n):
     return all_edges
 
 
-def create_edges(n):
+def create_edges(n, rng=random):
     "Generation of random graph"
     all_edges = get_all_possible_edges(n)
 
@@ -23,20 +23,20 @@ def create_edges(n):
         filter(lambda edge: edge[0] + 1 == edge[1], all_edges))
 
     remaining_edges = all_edges - edges
-    for _ in range(randint(0, len(remaining_edges))):
-        random_edge = choice(list(remaining_edges))
+    for _ in range(rng.randint(0, len(remaining_edges))):
+        random_edge = rng.choice(list(remaining_edges))
         remaining_edges -= {(random_edge)}
         edges = edges.union({(random_edge)})
     return list(edges)
 
 
-def create_vertices(n, size):
+def create_vertices(n, size, rng=random):
     "Generation of random vertices"
     vertices = set()
     for y in range(size):
         for x in range(size):
             vertices.add((y, x))
-    return sample(vertices, n)
+    return rng.sample(sorted(vertices), n)
 
 
 def resize_vertices(vertices, scale):
@@ -59,36 +59,36 @@ def find_adjacent_edges(my_edge, edges):
 
 
 class Creature:
-    ''' Saves the data of a creature '''
+    ''' Saves the data of a creature, the widgets of the gui are kept in an optional view '''
+    __slots__ = ('n', 'identity', 'size', 'vertices', 'edges', 'fitness', 'parent', 'view')
     count = 0
 
-    def __init__(self, **kwargs):
-        self.n = kwargs.get('n')
-
-        identity = kwargs.get('identity', None)
+    def __init__(self, *, n=None, identity=None, size=10, vertices=None, edges=None,
+                 fitness=0.0, parent=None, rng=random, view_port=None):
+        self.n = n
         if identity is None:
             self.identity = Creature.count + 1
             Creature.count += 1
         else:
             self.identity = identity
-        self.size = kwargs.get('size', 10)
-        self.vertices = kwargs.get('vertices', create_vertices(self.n, self.size))
-        self.edges = kwargs.get('edges', create_edges(self.n))
-        self.fitness = kwargs.get('fitness', 0.0)
-        self.parent = kwargs.get('parent', None)
-
-        # Tkinter GUI
-        view_port = kwargs.get('view_port', None)
-        if view_port is not None:
-            self.view_port = view_port
-            self.frame = tk.Frame(self.view_port)
-            self.right_click = None
-            self.description = tk.Label(
-                self.frame, font=(None, 7,), width=10, anchor='w', justify='left')
+        self.size = size
+        # The random genome is only created when it is not given
+        self.vertices = create_vertices(n, size, rng) if vertices is None else vertices
+        self.edges = create_edges(n, rng) if edges is None else edges
+        self.fitness = fitness
+        self.parent = parent
+
+        # Tkinter GUI, which is only imported when the creature is shown
+        if view_port is None:
+            self.view = None
         else:
-            self.view_port = None
-            self.frame = None
-            self.description = None
+            from .view import CreatureView  # pylint: disable=import-outside-toplevel
+            self.view = CreatureView(view_port)
+
+    @property
+    def view_port(self):
+        ''' View port of the gui that shows the creature '''
+        return None if self.view is None else self.view.view_port
 
     def get_data(self):
         ''' Returns a picklable data '''
@@ -104,6 +104,7 @@ class Creature:
 
     def get_image(self, scale=50):
         ''' Returns a cv2 image representation of the creature '''
+        import cv2  # pylint: disable=import-outside-toplevel
         vertices, edges = self.vertices, self.edges
         padding = scale
         paper = np.ones((scale*self.size, scale*self.size, 3)).astype(np.uint8) * 255
@@ -129,17 +130,10 @@ class Creature:
 
     def draw_creature(self, scale=50):
         "Draws connected graph using vertices and edges"
+        import cv2  # pylint: disable=import-outside-toplevel
         cv2.imshow("", self.get_image(scale))
         cv2.waitKey()
 
     def get_species(self):
         ''' Returns the species code of the creature '''
         return f'V{len(self.vertices)}'
-
-    def set_description(self):
-        ''' Sets the description label component '''
-        self.description['text'] = (
-            f'Creature {self.identity} \n'
-            f'Fit.: {"{:.2f}".format(self.fitness)}\n'
-            f'Spe.: {self.get_species()}'
-        )
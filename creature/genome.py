@@ -0,0 +1,138 @@
+''' Module of a compact genome that stores the edges of a creature as a bitmask '''
+import random
+from functools import lru_cache
+
+from settings import MAX_EDGE_CHANGE_COUNT, MAX_VERTICES_PIXEL_CHANGE
+
+# Moves of a vertex coordinate, at least one pixel in either direction
+VERTEX_CHANGES = tuple(sign * change for sign in (-1, 1)
+                       for change in range(1, MAX_VERTICES_PIXEL_CHANGE + 1))
+
+
+def get_edge_bit(edge):
+    ''' Returns the bit of an edge, the edges of n vertices are the lowest n(n-1)/2 bits '''
+    return get_pair_bit(*edge)
+
+
+@lru_cache(maxsize=None)
+def get_pair_bit(vertex_a, vertex_b):
+    ''' Returns the bit of the edge between two vertices '''
+    vertex_a, vertex_b = sorted((vertex_a, vertex_b))
+    return 1 << (vertex_b * (vertex_b - 1) // 2 + vertex_a)
+
+
+def get_edge_mask(edges):
+    ''' Returns the bitmask of a list of edges '''
+    mask = 0
+    for vertex_a, vertex_b in edges:
+        mask |= get_pair_bit(vertex_a, vertex_b)
+    return mask
+
+
+def get_mask_edges(mask, n):
+    ''' Returns the edges of a bitmask as a list of tuples in the order of their bits '''
+    bit_edges = get_bit_edges(n)
+    edges = []
+    while mask:
+        bit = mask & -mask
+        edges.append(bit_edges[bit.bit_length() - 1])
+        mask ^= bit
+    return edges
+
+
+def mutate_edges(mask, n, rng=random):
+    ''' Returns an edge bitmask with some edges added or removed, the edges between consecutive
+    vertices are never removed '''
+    add_mask = ((1 << n * (n - 1) // 2) - 1) & ~mask
+    remove_mask = mask & ~get_chain_mask(n)
+    add = rng.random() < 0.5 if add_mask else False
+    if not remove_mask:
+        add = True
+
+    candidates = add_mask if add else remove_mask
+    bits = []
+    while candidates:
+        bit = candidates & -candidates
+        bits.append(bit)
+        candidates ^= bit
+    for bit in rng.sample(bits, min(rng.randint(1, MAX_EDGE_CHANGE_COUNT), len(bits))):
+        mask ^= bit
+    return mask
+
+
+def move_vertex(vertex, size, rng=random):
+    ''' Returns a vertex moved by a few pixels in both directions, within the size '''
+    x, y = vertex
+    x = min(max(x + rng.choice(VERTEX_CHANGES), 0), size - 1)
+    return x, min(max(y + rng.choice(VERTEX_CHANGES), 0), size - 1)
+
+
+@lru_cache(maxsize=None)
+def get_bit_edges(n):
+    ''' Returns the edges of n vertices in the order of their bits '''
+    return tuple((vertex_a, vertex_b) for vertex_b in range(n) for vertex_a in range(vertex_b))
+
+
+@lru_cache(maxsize=None)
+def get_chain_mask(n):
+    ''' Returns the bitmask of the edges between consecutive vertices '''
+    mask = 0
+    for vertex in range(n - 1):
+        mask |= get_edge_bit((vertex, vertex + 1))
+    return mask
+
+
+class Genome:
+    ''' Hashable genome with the vertices packed in bytes and the edges in an integer bitmask,
+    it does not keep the order of the edges '''
+    __slots__ = ('vertices', 'edges')
+
+    def __init__(self, vertices: bytes, edges: int):
+        self.vertices = vertices
+        self.edges = edges
+
+    @classmethod
+    def from_lists(cls, vertices, edges):
+        ''' Returns the genome of vertices and edges lists '''
+        return cls(bytes(int(value) for vertex in vertices for value in vertex),
+                   get_edge_mask(edges))
+
+    @classmethod
+    def from_data(cls, data):
+        ''' Returns the genome of the data of a creature '''
+        return cls.from_lists(data['vertices'], data['edges'])
+
+    @property
+    def n(self):
+        ''' Number of vertices '''
+        return len(self.vertices) // 2
+
+    def get_vertices(self):
+        ''' Returns the vertices as a list of tuples '''
+        return list(zip(self.vertices[::2], self.vertices[1::2]))
+
+    def get_edges(self):
+        ''' Returns the edges as a list of tuples in the order of their bits '''
+        return get_mask_edges(self.edges, self.n)
+
+    def to_data(self):
+        ''' Returns the part of the data of a creature that the genome holds '''
+        return {'n': self.n, 'vertices': self.get_vertices(), 'edges': self.get_edges()}
+
+    def mutate(self, size, rng=random):
+        ''' Returns a genome with some edges added or removed and the first vertex moved, like
+        change_structure '''
+        edges = mutate_edges(self.edges, self.n, rng)
+        vertex = move_vertex(self.vertices[:2], size, rng)
+        return Genome(bytes(vertex) + self.vertices[2:], edges)
+
+    def __eq__(self, other):
+        return (isinstance(other, Genome) and self.vertices == other.vertices
+                and self.edges == other.edges)
+
+    def __hash__(self):
+        # Bytes hashes change between processes, integer hashes do not
+        return hash((int.from_bytes(self.vertices, 'little'), len(self.vertices), self.edges))
+
+    def __repr__(self):
+        return f'Genome({self.get_vertices()}, {self.get_edges()})'
@@ -1,6 +1,7 @@
 "Module to perform unittest"
+import random
 import unittest
-from . import Creature
+from . import Creature, Genome
 
 
 class TestCases(unittest.TestCase):
@@ -13,6 +14,42 @@ class TestCases(unittest.TestCase):
             creature = Creature(n=n)
             creature.draw_creature()
 
+    def test_seeded_creation(self):
+        ''' Tests that the same seed gives the same creatures '''
+        first = Creature(n=6, size=7, rng=random.Random(3))
+        second = Creature(n=6, size=7, rng=random.Random(3))
+        self.assertEqual(first.vertices, second.vertices)
+        self.assertEqual(first.edges, second.edges)
+
+    def test_rehydration(self):
+        ''' Tests that a creature of saved data does not draw a random genome '''
+        data = Creature(n=6, size=7, rng=random.Random(3)).get_data()
+        rng = random.Random(5)
+        state = rng.getstate()
+        creature = Creature(**data, rng=rng)
+        self.assertEqual(rng.getstate(), state)
+        self.assertEqual(creature.get_data(), data)
+        self.assertIsNone(creature.view_port)
+        self.assertFalse(hasattr(creature, '__dict__'))
+
+    def test_genome(self):
+        ''' Tests the conversion, equality and mutation of the bitmask genome '''
+        creature = Creature(n=6, size=7, rng=random.Random(4))
+        genome = Genome.from_data(creature.get_data())
+        self.assertEqual(genome.get_vertices(), creature.vertices)
+        self.assertEqual(sorted(genome.get_edges()), sorted(creature.edges))
+        self.assertEqual(genome, Genome.from_lists(creature.vertices, creature.edges[::-1]))
+        self.assertEqual(hash(genome), hash(Genome(bytes(genome.vertices), genome.edges)))
+        self.assertEqual(genome.n, 6)
+
+        rng = random.Random(4)
+        for _ in range(100):
+            mutated = genome.mutate(creature.size, rng)
+            self.assertNotEqual(mutated.edges, genome.edges)
+            chain = {(i, i + 1) for i in range(5)}
+            self.assertTrue(chain <= set(mutated.get_edges()))
+            self.assertEqual(mutated.get_vertices()[1:], genome.get_vertices()[1:])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,30 @@
+''' Module of the tkinter widgets that show a creature in the gui '''
+import tkinter as tk
+
+
+class CreatureView:
+    ''' Frame, description label and context menu of a creature in a view port '''
+    __slots__ = ('view_port', 'frame', 'description', 'right_click')
+
+    def __init__(self, view_port):
+        self.view_port = view_port
+        self.frame = tk.Frame(view_port)
+        self.right_click = None
+        self.description = tk.Label(
+            self.frame, font=(None, 7,), width=10, anchor='w', justify='left')
+
+    def set_description(self, creature):
+        ''' Sets the description label component '''
+        self.description['text'] = (
+            f'Creature {creature.identity} \n'
+            f'Fit.: {"{:.2f}".format(creature.fitness)}\n'
+            f'Spe.: {creature.get_species()}'
+        )
+
+    def destroy(self):
+        ''' Removes the widgets from the view port '''
+        self.frame.grid_forget()
+        if self.right_click is not None:
+            self.right_click.menu.destroy()
+        self.description.destroy()
+        self.frame.destroy()
@@ -3,17 +3,22 @@
 import os
 import random
 from argparse import ArgumentParser
-from copy import copy
 
+import numpy as np
 from tqdm import tqdm
 
-from reproduction import reproduce
-from creature import Creature
-from file import save_generations, load_generations
-from simulation import Simulation
+from cache import FitnessCache
+from reproduction import GenomeIndex
+from selection import select
+from config import RunConfig, add_arguments, get_config
+from population import Population
+from file import (
+    get_generation_log, get_file_storage, get_resumed_log, reserve_name, append_generation,
+    get_column_store, append_columns, load_generations, compact_creatures, get_retained_path,
+    write_retained, load_retained_identities, CheckpointWriter)
+from simulation import Simulation, simulate_multi_fidelity
 from settings import (
-    POPULATION_SIZE, SELECTION_SIZE, OFFSPRINGS_PER_SELECTION_SIZE, RANDOM_NEW_POPULATION_SIZE,
-    MIN_VERTICES_COUNT, MAX_VERTICES_COUNT, MAX_SIZE, K_COUNT)
+    MIN_VERTICES_COUNT, MAX_VERTICES_COUNT, MAX_SIZE, FITNESS_CACHE_PATH, COMPACTION_INTERVAL)
 from util import get_default_name
 COL_COUNT = 8
 
@@ -26,55 +31,93 @@ def create_directories():
 class Cui:
     ''' Main cui class '''
 
-    def __init__(self, repeat=100, load_path=None):
+    def __init__(self, repeat=100, load_path=None, use_cache=True, seed=None, config=None):
         self.repeat = repeat
+        self.config = RunConfig() if config is None else config
+        self.storage = self.config.storage
+        self.rng = random if seed is None else random.Random(seed)
         self.completed = 0
         self.load_path = load_path
-        self.save_as = get_default_name()
-        self.simulation = Simulation()
-        self.creatures = []
+        self.save_as = get_default_name(self.config.population_size)
+        self.cache = FitnessCache(FITNESS_CACHE_PATH) if use_cache else None
+        self.simulation = Simulation.from_config(self.config, self.cache)
+        self.screening = None
+        if self.config.multi_fidelity:
+            self.screening = Simulation.from_config(self.config, self.cache, screening=True)
+        self.new_identities = set()
+        self.tiers = []
+        self.population = None
         self.serializable_creatures = {}
         self.generations = []
+        self.log = None
+        self.columns = None
+        self.writer = CheckpointWriter()
+        self.genomes = GenomeIndex()
 
     def create_generation(self):
         ''' Creates a generation file '''
-        print('Saving the generations data to file')
-        creatures = []
-        for creature in self.creatures:
-            data = creature.get_data()
-            self.serializable_creatures[creature.identity] = data
-            creatures.append(creature.identity)
-        self.generations.append(creatures)
-        save_generations(
-            self.generations,
-            self.serializable_creatures,
-            self.save_as,
-        )
+        print('Queueing the generations data to be saved')
+        new_creatures = {}
+        for i, identity in enumerate(self.population.identity.tolist()):
+            data = self.population.get_data(i)
+            if self.serializable_creatures.get(identity) != data:
+                new_creatures[identity] = data
+            self.serializable_creatures[identity] = data
+        self.generations.append(self.population.identity.tolist())
+        self.genomes.update(new_creatures.values())
+        if self.log is None:
+            # Only a resumed run continues in existing files
+            self.save_as = reserve_name(self.save_as, self.storage)
+        self.log = get_generation_log(self.log, self.save_as, self.storage)
+        append_generation(self.log, self.generations, self.serializable_creatures,
+                          new_creatures, self.writer)
+        self.columns = get_column_store(self.columns, self.save_as)
+        append_columns(self.columns, self.generations, self.serializable_creatures, self.writer)
+        if self.cache is not None:
+            self.writer.submit(self.cache.write, self.cache.snapshot())
+        if len(self.generations) % COMPACTION_INTERVAL == 0:
+            removed = compact_creatures(self.generations, self.serializable_creatures)
+            print(f'Dropped {removed} creatures that are no longer needed from memory')
+            if removed:
+                self.genomes = GenomeIndex(self.serializable_creatures.values())
+            self.writer.submit(write_retained, get_retained_path(self.log.file_path),
+                               len(self.generations), list(self.serializable_creatures))
 
     def threaded_create(self):
         ''' Creates an initial population of creatures '''
         print('Creating initial population')
-        for _ in range(POPULATION_SIZE):
-            creature = Creature(
-                n=random.randint(MIN_VERTICES_COUNT, MAX_VERTICES_COUNT),
-                size=MAX_SIZE)
-            self.creatures.append(creature)
+        self.population = Population.create_random(
+            self.config.population_size, MAX_SIZE, MIN_VERTICES_COUNT, MAX_VERTICES_COUNT, self.rng)
 
     def threaded_find_fitness_no_gui(self):
         ''' Finds the fitness of all the creatures with render off '''
         print('Finding the fitness of all the population')
-        fitness = self.simulation.simulate(self.creatures)
-        for creature in self.creatures:
-            creature.fitness = fitness[creature.identity]
+        creatures = self.population.get_individuals()
+        if self.screening is None:
+            fitness = self.simulation.simulate(creatures)
+        else:
+            candidates = [c for c in creatures if c.identity in self.new_identities]
+            fitness, tiers = simulate_multi_fidelity(
+                self.simulation, self.screening, creatures, candidates,
+                percentile=self.config.screening_percentile)
+            self.tiers.append(tiers)
+            print(f'Screened {tiers["screened"]} new creatures, promoted {tiers["promoted"]}, '
+                  f'saved about {tiers["time_saved"]:.1f}s')
+        self.population.fitness[:] = [fitness[i] for i in self.population.identity.tolist()]
+        if self.cache is not None:
+            print(f'Fitness cache: {self.cache.hits} hits, {self.cache.misses} misses')
+        stats = self.simulation.stats
+        print(f'Simulated {stats["steps"]}/{self.simulation.step_limit} steps, '
+              f'saved {stats["body_steps_saved"]} body steps')
 
     def threaded_sort(self):
         ''' Sorts the creatures based on the fitness values '''
         print('Sorting the population according to the fitness')
-        self.creatures.sort(key=lambda c: c.fitness, reverse=True)
+        self.population = self.population[self.population.ranking()]
         self.completed += 1
         print('-'*100)
         print(f'End of generation #{self.get_generation()}')
-        print(f'Max fitness: {"{:.2f}".format(self.creatures[0].fitness)}')
+        print(f'Max fitness: {"{:.2f}".format(self.population.fitness[0])}')
         print(f'{self.completed}/{self.repeat} generations completed')
         print('-'*100)
         self.create_generation()
@@ -82,60 +125,65 @@ class Cui:
     def threaded_selection(self):
         ''' Selects the creatures based on the fitness values '''
         print('Selecting the creatures based on the fitness values')
-        selected_population = []
-        creatures = copy(self.creatures)
-        for _ in range(SELECTION_SIZE):
-            selected = max(random.choices(creatures, k=K_COUNT), key=lambda c: c.fitness)
-            selected_population.append(selected)
-            creatures.remove(selected)
-
-        for _, creature in enumerate(copy(self.creatures)):
-            if creature not in selected_population:
-                self.creatures.remove(creature)
+        selected = select(self.population.fitness, self.config.selection_size,
+                          self.config.selection, self.rng, self.config.k_count)
+        self.population = self.population[np.sort(selected)]
 
     def threaded_reproduce(self):
         ''' Reproduces the creatures '''
         print('Reproducing the creatures')
-        creatures = copy(self.creatures)
-        self.creatures = []
-        for creature in creatures:
-            self.creatures.append(creature)
-            for _ in range(OFFSPRINGS_PER_SELECTION_SIZE):
-                offspring = reproduce(creature, self.serializable_creatures)
-                self.creatures.append(offspring)
-
-        for _ in range(RANDOM_NEW_POPULATION_SIZE):
-            creature = Creature(
-                n=random.randint(MIN_VERTICES_COUNT, MAX_VERTICES_COUNT),
-                size=MAX_SIZE)
-            self.creatures.append(creature)
+        parents = self.population
+        offsprings = parents.breed(self.config.offsprings_per_selection_size, self.rng,
+                                   self.genomes)
+        population = Population.concatenate([parents, offsprings])
+        # Each parent is followed by its offsprings
+        order = np.column_stack([
+            np.arange(len(parents)),
+            len(parents) + np.arange(len(offsprings)).reshape(len(parents), -1),
+        ]).ravel()
+
+        new = Population.create_random(self.config.random_new_population_size, MAX_SIZE,
+                                       MIN_VERTICES_COUNT, MAX_VERTICES_COUNT, self.rng)
+        self.new_identities = set(new.identity.tolist())
+        self.population = Population.concatenate([population[order], new])
 
     def threaded_train(self):
         ''' Does training for x generations '''
-        if self.load_path is None:
-            self.completed -= 1
-            self.threaded_create()
-            self.threaded_find_fitness_no_gui()
-            self.threaded_sort()
-        else:
-            self.threaded_load()
-        for _ in range(self.repeat):
-            self.threaded_selection()
-            self.threaded_reproduce()
-            self.threaded_find_fitness_no_gui()
-            self.threaded_sort()
+        try:
+            if self.load_path is None:
+                self.completed -= 1
+                self.threaded_create()
+                self.threaded_find_fitness_no_gui()
+                self.threaded_sort()
+            else:
+                self.threaded_load()
+            for _ in range(self.repeat):
+                self.threaded_selection()
+                self.threaded_reproduce()
+                self.threaded_find_fitness_no_gui()
+                self.threaded_sort()
+        finally:
+            print('Waiting for the checkpoints to be written')
+            self.writer.close()
+            self.simulation.close()
+            if self.screening is not None:
+                self.screening.close()
 
     def threaded_load(self):
         ''' Loads the saved data from file '''
-        data = load_generations(self.load_path)
+        data = load_generations(self.load_path, lazy=True)
         self.serializable_creatures = data['creatures']
         self.generations = data['generations']
+        retained = load_retained_identities(self.load_path, self.generations,
+                                            self.serializable_creatures)
+        self.genomes = GenomeIndex(self.serializable_creatures[i] for i in retained)
 
-        self.creatures = []
-        for creature_id in self.generations[-1]:
-            creature_data = self.serializable_creatures[creature_id]
-            creature = Creature(**creature_data)
-            self.creatures.append(creature)
+        self.population = Population.from_data(
+            [self.serializable_creatures[identity] for identity in self.generations[-1]])
+        self.save_as = os.path.basename(os.path.splitext(self.load_path)[0])
+        # Continues in the loaded file, a legacy pickle is saved with the selected storage
+        self.storage = get_file_storage(self.load_path, self.config.storage)
+        self.log = get_resumed_log(self.load_path)
 
     def get_generation(self):
         ''' Returns the current generation '''
@@ -147,14 +195,23 @@ def main():
     parser = ArgumentParser(description='Script to train the creatures using cli')
     parser.add_argument('--load-path', '-l', help='path to the exisiting generations data')
     parser.add_argument('--repeat', '-r', help='number of generations to train', default=100)
+    parser.add_argument('--seed', '-s', help='seed of the random generator for reproducible runs')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='simulate every creature without the fitness cache')
+    add_arguments(parser)
 
     args = parser.parse_args()
 
     try:
-        cui = Cui(int(args.repeat), args.load_path)
+        config = get_config(args)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    try:
+        seed = None if args.seed is None else int(args.seed)
+        cui = Cui(int(args.repeat), args.load_path, not args.no_cache, seed, config)
         cui.threaded_train()
     except ValueError:
-        print('Make sure that repeat argument is an integer')
+        print('Make sure that repeat and seed arguments are integers')
 
 
 if __name__ == '__main__':
@@ -1,24 +1,32 @@
 "Environment Module"
-from Box2D import b2EdgeShape, b2FixtureDef, b2PolygonShape
+from Box2D import b2EdgeShape
 
-from settings import STEP_LIMIT, MOTOR_SPEED, MAX_MOTOR_TORQUE, DENSITY, FRICTION
+from settings import FIDELITY_PROFILES
+from config import RunConfig
 from creature import Creature, find_adjacent_edges
-from framework.framework import Framework
-from maths.maths import line_to_rectangle
+from simulation import get_step_count
+from simulation.fixtures import get_fixture
 from maths.maths import get_position_of_creature
 THICKNESS = 0.5
 
 
-class Environment(Framework):
-    "Environment class"
+class Environment:
+    "Environment class, framework.framework.main adds the framework of the backend as its base"
     speed = 1000  # platform speed
     env = None
 
-    def __init__(self, name, creatures):
+    def __init__(self, name, creatures, config=None, settings=None):
+        config = RunConfig() if config is None else config
         Environment.name = name
-        self.env = super(Environment, self).__init__()
+        self.env = super(Environment, self).__init__(settings)
         self.settings.drawJoints = False
-        Environment.step_limit = STEP_LIMIT
+        profile = FIDELITY_PROFILES[config.fidelity]
+        self.settings.hz = profile['hz']
+        self.settings.velocityIterations = profile['velocity_iterations']
+        self.settings.positionIterations = profile['position_iterations']
+        self.settings.enableContinuous = profile['continuous']
+        self.settings.enableSubStepping = profile['sub_stepping']
+        Environment.step_limit = get_step_count(config.step_limit, config.fidelity)
 
         _ = self.world.CreateBody(
             shapes=b2EdgeShape(vertices=[(-1000, -1), (1000, -1)])
@@ -30,14 +38,7 @@ class Environment(Framework):
 
             for edge in creature.edges:
                 vertex = creature.vertices[edge[0]], creature.vertices[edge[1]]
-                point = line_to_rectangle(*vertex, THICKNESS)
-
-                fixture = b2FixtureDef(
-                    shape=b2PolygonShape(vertices=point),
-                    density=DENSITY,
-                    friction=FRICTION,
-                )
-                fixture.filter.groupIndex = -1
+                fixture = get_fixture(*vertex, THICKNESS, config.density, config.friction)
                 body[tuple(edge)] = self.world.CreateDynamicBody(
                     fixtures=fixture,
                 )
@@ -51,8 +52,8 @@ class Environment(Framework):
                         bodyB=body[tuple(a_edge)],
                         anchor=anchor,
                         collideConnected=True,
-                        motorSpeed=MOTOR_SPEED,
-                        maxMotorTorque=MAX_MOTOR_TORQUE,
+                        motorSpeed=config.motor_speed,
+                        maxMotorTorque=config.max_motor_torque,
                         enableMotor=True,
                     )
             Environment.creature_bodies[creature.identity] = body[tuple(edge)]
@@ -1,8 +1,18 @@
 ''' Module to save and load creature data to file '''
+import glob
 import pickle
 import os
 
 from creature import Creature
+from settings import STORAGE
+from .log import GenerationLog, load_generation_log, write_generations
+from .lazy import LazyCreatures, LazyGenerations, load_lazy_generation_log
+from .sqlite import LineageDatabase, DatabaseCreatures, load_database
+from .columns import ColumnStore, write_columns
+from .retention import (
+    get_retained_identities, compact_creatures, get_retained_path, write_retained,
+    load_retained_identities)
+from .writer import CheckpointWriter
 
 
 def save_creature(creature: dict):
@@ -23,9 +33,124 @@ def save_generations(generations, creatures, file_name):
                      'creature_count': Creature.count}, file)
 
 
-def load_generations(file_path):
-    ''' Loads generations data from a file '''
+# Extension of the generations file of every storage
+STORAGE_EXTENSIONS = {'log': '.log', 'sqlite': '.db'}
+
+
+def get_file_storage(file_path, storage=STORAGE):
+    ''' Returns the storage of a generations file, a legacy pickle gets the given storage '''
+    for name, extension in STORAGE_EXTENSIONS.items():
+        if file_path.endswith(extension):
+            return name
+    return storage
+
+
+def get_log_path(file_name, storage=STORAGE):
+    ''' Returns the path of the generations log or database of a name '''
+    return f'data/generations/{file_name}{STORAGE_EXTENSIONS[storage]}'
+
+
+def get_columns_path(file_name):
+    ''' Returns the path of the column store of a name '''
+    return f'data/generations/{file_name}.columns'
+
+
+def reserve_name(file_name, storage=STORAGE):
+    ''' Returns a name that no saved run uses yet, adding a number to the name when needed. The
+    log or database of the name is created at once, so runs that start together get different
+    names '''
+    name, number = file_name, 1
+    while True:
+        log_path = get_log_path(name, storage)
+        # Any file of the name, like the columns or the log of another storage, takes it
+        if not glob.glob(f'{glob.escape(os.path.splitext(log_path)[0])}.*'):
+            try:
+                with open(log_path, 'x'):
+                    return name
+            except FileExistsError:
+                pass
+        number += 1
+        name = f'{file_name}_{number}'
+
+
+def get_column_store(store, file_name):
+    ''' Returns the column store of a name, reusing the given store when it is already open '''
+    directory = get_columns_path(file_name)
+    if store is not None and store.directory == directory:
+        return store
+    return ColumnStore(directory)
+
+
+def append_columns(store, generations, creatures, writer=None):
+    ''' Appends the last generation to a column store, writing the earlier generations that the
+    store does not have yet first. The last generation is written by the writer when one is
+    given '''
+    if len(store) < len(generations) - 1:
+        write_columns(store, generations[len(store):-1], creatures)
+    columns = store.prepare([creatures[identity] for identity in generations[-1]])
+    if writer is None:
+        store.write(columns)
+    else:
+        writer.submit(store.write, columns)
+
+
+def get_generation_log(log, file_name, storage=STORAGE):
+    ''' Returns the log or database of a name, reusing the given one when it is already open '''
+    file_path = get_log_path(file_name, storage)
+    if log is not None and log.file_path == file_path:
+        return log
+    if storage == 'sqlite':
+        return LineageDatabase(file_path)
+    return GenerationLog(file_path)
+
+
+def get_resumed_log(file_path):
+    ''' Returns the log or database that a run loaded from a file continues in, or None when
+    the file is not the saved log of its name, like a legacy pickle '''
+    storage = get_file_storage(file_path, None)
+    name = os.path.basename(os.path.splitext(file_path)[0])
+    if storage is None:
+        return None
+    if os.path.abspath(file_path) != os.path.abspath(get_log_path(name, storage)):
+        return None
+    return get_generation_log(None, name, storage)
+
+
+def append_generation(log, generations, creatures, new_creatures, writer=None):
+    ''' Appends the last generation to a log, writing the earlier generations first when the log
+    does not have them yet. The last generation is written by the writer when one is given '''
+    if not log and len(generations) > 1:
+        write_generations(log, generations[:-1], creatures, Creature.count)
+    record = log.prepare(generations[-1], new_creatures, Creature.count)
+    if writer is None:
+        log.write(record)
+    else:
+        writer.submit(log.write, record)
+
+
+def load_generations(file_path, lazy=False):
+    ''' Loads generations data from a file, a lazily loaded log or database only reads its last
+    generation '''
+    if file_path.endswith('.db'):
+        data = load_database(file_path, lazy)
+    elif file_path.endswith('.log') and lazy:
+        data = load_lazy_generation_log(file_path)
+    elif file_path.endswith('.log'):
+        data = load_generation_log(file_path)
+    else:
+        with open(file_path, 'rb') as file:
+            data = pickle.load(file)
+    Creature.count = data['creature_count']
+    return data
+
+
+def convert_generations(file_path):
+    ''' Converts a generations pickle file to a log next to it and returns the path of the log '''
     with open(file_path, 'rb') as file:
         data = pickle.load(file)
-        Creature.count = data['creature_count']
-        return data
+    log_path = f'{os.path.splitext(file_path)[0]}.log'
+    if os.path.exists(log_path):
+        raise FileExistsError(f'{log_path} already exists')
+    write_generations(GenerationLog(log_path), data['generations'], data['creatures'],
+                      data['creature_count'])
+    return log_path
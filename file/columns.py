@@ -0,0 +1,95 @@
+''' Module to store the creatures of every generation as columns that can be memory mapped '''
+import os
+
+import numpy as np
+
+# Data type of every column, parent is -1 for creatures without one
+COLUMNS = {
+    'identity': np.int64,
+    'fitness': np.float64,
+    'vertices': np.int32,
+    'edges': np.int32,
+    'parent': np.int64,
+}
+OFFSET_SIZE = np.dtype(np.int64).itemsize
+
+
+class ColumnStore:
+    ''' Directory of append-only column files with one row per creature of each generation, the
+    offsets file holds the first row of each generation and is written last '''
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.offsets_path = os.path.join(directory, 'offsets.bin')
+        # Generations that are prepared, including the ones still waiting to be written
+        self.length = len(self.read_offsets()) - 1
+
+    def prepare(self, creatures):
+        ''' Returns the columns of the data of the creatures of a generation '''
+        self.length += 1
+        return {
+            'identity': np.array([c['identity'] for c in creatures], dtype=COLUMNS['identity']),
+            'fitness': np.array([c['fitness'] for c in creatures], dtype=COLUMNS['fitness']),
+            'vertices': np.array([len(c['vertices']) for c in creatures],
+                                 dtype=COLUMNS['vertices']),
+            'edges': np.array([len(c['edges']) for c in creatures], dtype=COLUMNS['edges']),
+            'parent': np.array([-1 if c.get('parent') is None else c['parent']
+                                for c in creatures], dtype=COLUMNS['parent']),
+        }
+
+    def write(self, columns):
+        ''' Appends prepared columns, the rows are only part of the store once the offset of the
+        generation is written '''
+        os.makedirs(self.directory, exist_ok=True)
+        offsets = self.read_offsets()
+        size = offsets[-1] + len(columns['identity'])
+        for name, dtype in COLUMNS.items():
+            with open(self.get_path(name), 'ab') as file:
+                # Rows of an interrupted write are dropped
+                file.truncate(offsets[-1] * np.dtype(dtype).itemsize)
+                columns[name].astype(dtype).tofile(file)
+                file.flush()
+                os.fsync(file.fileno())
+        with open(self.offsets_path, 'ab') as file:
+            file.truncate((len(offsets) - 1) * OFFSET_SIZE)
+            np.array([size], dtype=np.int64).tofile(file)
+            file.flush()
+            os.fsync(file.fileno())
+
+    def append(self, creatures):
+        ''' Appends the data of the creatures of a generation '''
+        self.write(self.prepare(creatures))
+
+    def read_offsets(self):
+        ''' Returns the first row of every generation and the number of rows '''
+        if not os.path.exists(self.offsets_path):
+            return np.zeros(1, dtype=np.int64)
+        with open(self.offsets_path, 'rb') as file:
+            data = file.read()
+        offsets = np.frombuffer(data[:len(data) - len(data) % OFFSET_SIZE], dtype=np.int64)
+        return np.concatenate([np.zeros(1, dtype=np.int64), offsets])
+
+    def read(self):
+        ''' Returns the offsets and the memory mapped columns '''
+        offsets = self.read_offsets()
+        columns = {}
+        for name, dtype in COLUMNS.items():
+            if offsets[-1] == 0:
+                columns[name] = np.empty(0, dtype=dtype)
+            else:
+                columns[name] = np.memmap(self.get_path(name), dtype=dtype, mode='r',
+                                          shape=(int(offsets[-1]),))
+        return offsets, columns
+
+    def get_path(self, name):
+        ''' Returns the path of the file of a column '''
+        return os.path.join(self.directory, f'{name}.bin')
+
+    def __len__(self):
+        return self.length
+
+
+def write_columns(store, generations, creatures):
+    ''' Appends whole generations to a column store '''
+    for generation in generations:
+        store.append([creatures[identity] for identity in generation if identity in creatures])
@@ -0,0 +1,85 @@
+''' Module to load a generations log lazily, reading the records only when they are needed '''
+from collections.abc import MutableMapping, Sequence
+from functools import lru_cache
+
+from .log import GenerationLog
+
+# Number of decoded records that are kept in memory
+RECORD_CACHE_SIZE = 16
+
+
+class LazyGenerations(Sequence):
+    ''' Rankings of the generations of a log, new generations are appended in memory '''
+
+    def __init__(self, log, read):
+        self.size = len(log.index)
+        self.read = read
+        self.appended = []
+
+    def __getitem__(self, number):
+        if isinstance(number, slice):
+            return [self[i] for i in range(*number.indices(len(self)))]
+        if number < 0:
+            number += len(self)
+        if not 0 <= number < len(self):
+            raise IndexError('generation index out of range')
+        if number < self.size:
+            return self.read(number)['generation']
+        return self.appended[number - self.size]
+
+    def __len__(self):
+        return self.size + len(self.appended)
+
+    def append(self, generation):
+        ''' Appends a generation in memory '''
+        self.appended.append(generation)
+
+
+class LazyCreatures(MutableMapping):
+    ''' Creatures of a log that are read from their record the first time they are accessed, the
+    creatures that are read or set are kept in memory '''
+
+    def __init__(self, log, read):
+        self.index = log.read_creature_index()
+        self.read = read
+        self.loaded = {}
+
+    def __getitem__(self, identity):
+        if identity not in self.loaded:
+            self.loaded[identity] = self.read(self.index[identity])['creatures'][identity]
+        return self.loaded[identity]
+
+    def __setitem__(self, identity, data):
+        self.loaded[identity] = data
+
+    def __delitem__(self, identity):
+        if identity not in self.loaded and identity not in self.index:
+            raise KeyError(identity)
+        self.loaded.pop(identity, None)
+        self.index.pop(identity, None)
+
+    def __contains__(self, identity):
+        return identity in self.loaded or identity in self.index
+
+    def __iter__(self):
+        yield from self.loaded
+        for identity in self.index:
+            if identity not in self.loaded:
+                yield identity
+
+    def __len__(self):
+        return len(self.index.keys() | self.loaded.keys())
+
+
+def load_lazy_generation_log(file_path):
+    ''' Loads a log with only the creatures of its last generation in memory, the other creatures
+    and generations are read on demand '''
+    log = GenerationLog(file_path)
+    read = lru_cache(maxsize=RECORD_CACHE_SIZE)(log.read)
+    generations = LazyGenerations(log, read)
+    creatures = LazyCreatures(log, read)
+    for identity in generations[-1]:
+        creatures[identity]  # pylint: disable=pointless-statement
+    return {'generations': generations,
+            'creatures': creatures,
+            'creature_count': read(len(generations) - 1)['creature_count']}
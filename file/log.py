@@ -0,0 +1,131 @@
+''' Module to append generations to a log file that is never rewritten '''
+import os
+import pickle
+import struct
+
+# Offset and length of the record of a generation in the log file
+INDEX_ENTRY = struct.Struct('<QQ')
+# Identity of a creature and the number of the record it was last written in
+CREATURE_ENTRY = struct.Struct('<QQ')
+
+
+class GenerationLog:
+    ''' Append-only log of generations, each record only holds the ranking of the generation and
+    the creatures that are new or changed since the previous records '''
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.index_path = f'{os.path.splitext(file_path)[0]}.idx'
+        self.creature_index_path = f'{os.path.splitext(file_path)[0]}.cidx'
+        self.index = []
+        if os.path.exists(self.index_path):
+            self.index = read_index(self.index_path)
+        # Records that are prepared, including the ones still waiting to be written
+        self.length = len(self.index)
+
+    def append(self, generation, creatures, creature_count):
+        ''' Appends a generation and its new creatures to the log '''
+        self.write(self.prepare(generation, creatures, creature_count))
+
+    def prepare(self, generation, creatures, creature_count):
+        ''' Returns the record of a generation, which is a snapshot that can be written later '''
+        self.length += 1
+        data = pickle.dumps({
+            'generation': list(generation),
+            'creatures': creatures,
+            'creature_count': creature_count,
+        })
+        return data, tuple(creatures)
+
+    def write(self, record):
+        ''' Writes a prepared record, the record is only part of the log once the index that
+        points to it has been replaced '''
+        data, identities = record
+        number = len(self.index)
+        with open(self.file_path, 'ab') as file:
+            offset = file.tell()
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        index = self.index + [(offset, len(data))]
+        temp_path = f'{self.index_path}.tmp'
+        with open(temp_path, 'wb') as file:
+            for entry in index:
+                file.write(INDEX_ENTRY.pack(*entry))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.index_path)
+        self.index = index
+        with open(self.creature_index_path, 'ab') as file:
+            # Drops a partial entry left by an interrupted write
+            file.truncate(file.tell() - file.tell() % CREATURE_ENTRY.size)
+            for identity in identities:
+                file.write(CREATURE_ENTRY.pack(identity, number))
+
+    def read(self, number):
+        ''' Returns the record of a single generation '''
+        offset, length = self.index[number]
+        with open(self.file_path, 'rb') as file:
+            file.seek(offset)
+            return pickle.loads(file.read(length))
+
+    def read_creature_index(self):
+        ''' Returns the number of the last record of every creature. The creature index is written
+        after a record is committed, so the last indexed record and the ones after it are read
+        again to complete it '''
+        creature_index = {}
+        if os.path.exists(self.creature_index_path):
+            for identity, number in read_index(self.creature_index_path, CREATURE_ENTRY):
+                if number < len(self.index):
+                    creature_index[identity] = number
+        start = max(creature_index.values(), default=0)
+        for number in range(start, len(self.index)):
+            for identity in self.read(number)['creatures']:
+                creature_index[identity] = number
+        return creature_index
+
+    def __len__(self):
+        return self.length
+
+
+def read_index(index_path, entry=INDEX_ENTRY):
+    ''' Reads the entries of an index file '''
+    with open(index_path, 'rb') as file:
+        data = file.read()
+    return list(entry.iter_unpack(data[:len(data) - len(data) % entry.size]))
+
+
+def write_generations(log, generations, creatures, creature_count):
+    ''' Appends whole generations to a log, writing each creature with its first generation '''
+    written = set()
+    for i, generation in enumerate(generations):
+        new_creatures = {}
+        for identity in generation:
+            # Creatures dropped by the retention policy are only missing from older generations
+            if identity not in written and identity in creatures:
+                new_creatures[identity] = creatures[identity]
+                written.add(identity)
+        if i == len(generations) - 1:
+            # Creatures that are not part of any generation are kept with the last one
+            for identity, data in creatures.items():
+                if identity not in written:
+                    new_creatures[identity] = data
+        log.append(generation, new_creatures, creature_count)
+
+
+def load_generation_log(file_path):
+    ''' Loads the generations, creatures and creature count of a log file '''
+    log = GenerationLog(file_path)
+    generations = []
+    creatures = {}
+    creature_count = 0
+    with open(file_path, 'rb') as file:
+        for offset, length in log.index:
+            file.seek(offset)
+            record = pickle.loads(file.read(length))
+            generations.append(record['generation'])
+            creatures.update(record['creatures'])
+            creature_count = record['creature_count']
+    return {'generations': generations,
+            'creatures': creatures,
+            'creature_count': creature_count}
@@ -0,0 +1,65 @@
+''' Module to drop the creatures that are no longer needed from memory '''
+import os
+
+import numpy as np
+
+from settings import RETENTION_GENERATIONS
+
+
+def get_retained_identities(generations, creatures, keep=RETENTION_GENERATIONS):
+    ''' Returns the identities of the creatures of the last generations and the ancestors of the
+    creatures of the last generation '''
+    retained = set()
+    for generation in generations[-keep:] if keep else generations[-1:]:
+        retained.update(generation)
+    ancestors = set()
+    for identity in generations[-1]:
+        parent = creatures[identity].get('parent')
+        # The whole chain is kept since reproduce compares an offspring with all its ancestors
+        while parent is not None and parent not in ancestors and parent in creatures:
+            ancestors.add(parent)
+            parent = creatures[parent].get('parent')
+    return retained | ancestors
+
+
+def compact_creatures(generations, creatures, keep=RETENTION_GENERATIONS):
+    ''' Removes the creatures that are not retained and returns how many were removed '''
+    if keep is None or not generations:
+        return 0
+    retained = get_retained_identities(generations, creatures, keep)
+    removed = [identity for identity in creatures if identity not in retained]
+    for identity in removed:
+        del creatures[identity]
+    return len(removed)
+
+
+def get_retained_path(log_path):
+    ''' Returns the path of the retained identities of a log or database '''
+    return f'{os.path.splitext(log_path)[0]}.retained'
+
+
+def write_retained(file_path, generation_count, identities):
+    ''' Writes the identities of the creatures that are in memory after the compaction of a
+    generation count, the file is replaced at once so an interrupted write keeps the old one '''
+    data = np.concatenate([np.array([generation_count], dtype=np.int64),
+                           np.fromiter(identities, dtype=np.int64)])
+    with open(f'{file_path}.tmp', 'wb') as file:
+        data.tofile(file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(f'{file_path}.tmp', file_path)
+
+
+def load_retained_identities(log_path, generations, creatures, keep=RETENTION_GENERATIONS):
+    ''' Returns the identities of the creatures that were in memory when a run saved its last
+    generation, which are the ones of its last compaction and of the generations after it. The
+    ancestors are only walked when the log has no compaction that matches its generations '''
+    file_path = get_retained_path(log_path)
+    if os.path.exists(file_path):
+        data = np.fromfile(file_path, dtype=np.int64)
+        if len(data) and data[0] <= len(generations):
+            retained = set(data[1:].tolist())
+            for generation in generations[int(data[0]):]:
+                retained.update(generation)
+            return retained
+    return get_retained_identities(generations, creatures, keep)
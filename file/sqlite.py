@@ -0,0 +1,205 @@
+''' Module to store the generations and the lineage of the creatures in a SQLite database '''
+import pickle
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS creatures (
+    identity INTEGER PRIMARY KEY,
+    parent INTEGER,
+    generation INTEGER NOT NULL,
+    fitness REAL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS generations (
+    number INTEGER PRIMARY KEY,
+    creature_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fitness (
+    generation INTEGER NOT NULL,
+    rank INTEGER NOT NULL,
+    identity INTEGER NOT NULL,
+    value REAL,
+    PRIMARY KEY (generation, rank)
+);
+CREATE INDEX IF NOT EXISTS creatures_parent ON creatures (parent);
+CREATE INDEX IF NOT EXISTS creatures_generation ON creatures (generation);
+CREATE INDEX IF NOT EXISTS fitness_identity ON fitness (identity);
+'''
+
+
+class LineageDatabase:
+    ''' Database of generations with the same interface as GenerationLog, each generation is
+    inserted in one transaction with the creatures that are new or changed '''
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        # The connection is shared by the training thread and the checkpoint writer
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(file_path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.executescript(SCHEMA)
+        # Generations that are prepared, including the ones still waiting to be written
+        self.length = self.query('SELECT COUNT(*) FROM generations')[0][0]
+
+    def append(self, generation, creatures, creature_count):
+        ''' Inserts a generation and its new creatures '''
+        self.write(self.prepare(generation, creatures, creature_count))
+
+    def prepare(self, generation, creatures, creature_count):
+        ''' Returns the rows of a generation, which are a snapshot that can be written later '''
+        number = self.length
+        self.length += 1
+        rows = [(identity, data.get('parent'), number, data.get('fitness'), pickle.dumps(data))
+                for identity, data in creatures.items()]
+        return number, list(generation), rows, creature_count
+
+    def write(self, record):
+        ''' Inserts prepared rows in one transaction '''
+        number, generation, rows, creature_count = record
+        with self.lock, self.connection:
+            self.connection.executemany(
+                'INSERT INTO creatures VALUES (?, ?, ?, ?, ?) ON CONFLICT (identity) DO UPDATE '
+                'SET fitness = excluded.fitness, data = excluded.data', rows)
+            self.connection.executemany(
+                'INSERT INTO fitness SELECT ?, ?, identity, fitness FROM creatures '
+                'WHERE identity = ?',
+                [(number, rank, identity) for rank, identity in enumerate(generation)])
+            self.connection.execute('INSERT INTO generations VALUES (?, ?)',
+                                    (number, creature_count))
+
+    def query(self, sql, parameters=()):
+        ''' Returns all the rows of a query '''
+        with self.lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+    def read(self, identity):
+        ''' Returns the data of a creature '''
+        rows = self.query('SELECT data FROM creatures WHERE identity = ?', (identity,))
+        if not rows:
+            raise KeyError(identity)
+        return pickle.loads(rows[0][0])
+
+    def read_generation(self, number):
+        ''' Returns the ranking of a generation '''
+        rows = self.query('SELECT identity FROM fitness WHERE generation = ? ORDER BY rank',
+                          (number,))
+        return [identity for identity, in rows]
+
+    def read_generations(self):
+        ''' Returns the rankings of all the generations '''
+        generations = [[] for _ in range(self.query('SELECT COUNT(*) FROM generations')[0][0])]
+        for number, identity in self.query(
+                'SELECT generation, identity FROM fitness ORDER BY generation, rank'):
+            generations[number].append(identity)
+        return generations
+
+    def ancestors(self, identity):
+        ''' Returns the identities of the parent, grandparent and so on of a creature '''
+        rows = self.query('''
+            WITH RECURSIVE lineage (identity, depth) AS (
+                SELECT parent, 1 FROM creatures WHERE identity = ?
+                UNION ALL
+                SELECT creatures.parent, depth + 1 FROM creatures
+                JOIN lineage ON creatures.identity = lineage.identity
+            )
+            SELECT identity FROM lineage WHERE identity IS NOT NULL ORDER BY depth''', (identity,))
+        return [ancestor for ancestor, in rows]
+
+    def descendants(self, identity):
+        ''' Returns the identities of all the offsprings of a creature and of their offsprings '''
+        rows = self.query('''
+            WITH RECURSIVE lineage (identity) AS (
+                SELECT identity FROM creatures WHERE parent = ?
+                UNION
+                SELECT creatures.identity FROM creatures
+                JOIN lineage ON creatures.parent = lineage.identity
+            )
+            SELECT identity FROM lineage ORDER BY identity''', (identity,))
+        return [descendant for descendant, in rows]
+
+    def best_lineage(self, generation=-1):
+        ''' Returns the best creature of a generation followed by its ancestors '''
+        if generation < 0:
+            generation += self.query('SELECT COUNT(*) FROM generations')[0][0]
+        rows = self.query('SELECT identity FROM fitness WHERE generation = ? AND rank = 0',
+                          (generation,))
+        if not rows:
+            return []
+        return [rows[0][0]] + self.ancestors(rows[0][0])
+
+    def survivors(self, generation):
+        ''' Returns the creatures of a generation that are still part of the next generation '''
+        rows = self.query('''
+            SELECT current.identity FROM fitness AS current
+            JOIN fitness AS next ON next.identity = current.identity AND next.generation = ?
+            WHERE current.generation = ? ORDER BY current.rank''', (generation + 1, generation))
+        return [identity for identity, in rows]
+
+    def close(self):
+        ''' Closes the connection '''
+        with self.lock:
+            self.connection.close()
+
+    def __len__(self):
+        return self.length
+
+
+class DatabaseCreatures(MutableMapping):
+    ''' Creatures of a database that are read the first time they are accessed, the creatures
+    that are read or set are kept in memory '''
+
+    def __init__(self, database):
+        self.database = database
+        self.identities = {identity for identity, in database.query(
+            'SELECT identity FROM creatures')}
+        self.loaded = {}
+
+    def __getitem__(self, identity):
+        if identity not in self.loaded:
+            if identity not in self.identities:
+                raise KeyError(identity)
+            self.loaded[identity] = self.database.read(identity)
+        return self.loaded[identity]
+
+    def __setitem__(self, identity, data):
+        self.loaded[identity] = data
+
+    def __delitem__(self, identity):
+        if identity not in self.loaded and identity not in self.identities:
+            raise KeyError(identity)
+        self.loaded.pop(identity, None)
+        self.identities.discard(identity)
+
+    def __contains__(self, identity):
+        return identity in self.loaded or identity in self.identities
+
+    def __iter__(self):
+        yield from self.loaded
+        for identity in self.identities:
+            if identity not in self.loaded:
+                yield identity
+
+    def __len__(self):
+        return len(self.identities | self.loaded.keys())
+
+
+def load_database(file_path, lazy=False):
+    ''' Loads the generations of a database, a lazily loaded database only reads the creatures of
+    its last generation '''
+    database = LineageDatabase(file_path)
+    generations = database.read_generations()
+    creature_count = database.query(
+        'SELECT creature_count FROM generations ORDER BY number DESC LIMIT 1')[0][0]
+    if lazy:
+        creatures = DatabaseCreatures(database)
+        for identity in generations[-1]:
+            creatures[identity]  # pylint: disable=pointless-statement
+    else:
+        creatures = {identity: pickle.loads(data)
+                     for identity, data in database.query('SELECT identity, data FROM creatures')}
+        database.close()
+    return {'generations': generations,
+            'creatures': creatures,
+            'creature_count': creature_count}
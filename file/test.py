@@ -1,6 +1,13 @@
 "Module to perform unittest"
+import os
+import pickle
+import shutil
+import tempfile
 import unittest
-from . import load_generations
+from . import (
+    load_generations, convert_generations, append_generation, GenerationLog, CheckpointWriter,
+    LineageDatabase, write_generations, compact_creatures, get_retained_path, write_retained,
+    load_retained_identities, get_file_storage, reserve_name, get_resumed_log)
 
 
 class FileTestCase(unittest.TestCase):
@@ -10,6 +17,165 @@ class FileTestCase(unittest.TestCase):
         ''' Tests the creation of some creatures '''
         print(load_generations('test_data/default.pickle'))
 
+    def test_file_storage(self):
+        ''' Tests that a loaded log or database keeps its storage '''
+        self.assertEqual(get_file_storage('data/generations/run.db', 'log'), 'sqlite')
+        self.assertEqual(get_file_storage('data/generations/run.log', 'sqlite'), 'log')
+        self.assertEqual(get_file_storage('test_data/default.pickle', 'sqlite'), 'sqlite')
+
+    def test_reserve_name(self):
+        ''' Tests that a new run never continues in the files of another run '''
+        directory = os.getcwd()
+        with tempfile.TemporaryDirectory() as temp:
+            os.makedirs(os.path.join(temp, 'data', 'generations'))
+            os.chdir(temp)
+            try:
+                self.assertEqual(reserve_name('run'), 'run')
+                self.assertEqual(reserve_name('run'), 'run_2')
+                os.makedirs('data/generations/other.columns')
+                self.assertEqual(reserve_name('other', 'sqlite'), 'other_2')
+                self.assertTrue(os.path.exists('data/generations/other_2.db'))
+
+                GenerationLog('data/generations/run.log').append([1], {1: {'identity': 1}}, 1)
+                self.assertEqual(len(get_resumed_log('data/generations/run.log')), 1)
+                shutil.copy('data/generations/run.log', temp)
+                self.assertIsNone(get_resumed_log(os.path.join(temp, 'run.log')))
+                self.assertIsNone(get_resumed_log('data/generations/run.pickle'))
+            finally:
+                os.chdir(directory)
+
+    def test_convert_generations(self):
+        ''' Tests that a converted log loads the same data as the pickle file '''
+        with open('test_data/default.pickle', 'rb') as file:
+            data = pickle.load(file)
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = shutil.copy('test_data/default.pickle', directory)
+            log_path = convert_generations(file_path)
+            self.assertEqual(load_generations(log_path), data)
+            self.assertRaises(FileExistsError, convert_generations, file_path)
+
+            log = GenerationLog(log_path)
+            self.assertEqual(len(log), len(data['generations']))
+            self.assertEqual(log.read(len(log) - 1)['generation'], data['generations'][-1])
+
+    def test_append_generation(self):
+        ''' Tests that appending only writes the new creatures of the last generation '''
+        creatures = {i: {'identity': i} for i in range(4)}
+        generations = [[0, 1], [1, 2]]
+        with tempfile.TemporaryDirectory() as directory:
+            log_path = os.path.join(directory, 'test.log')
+            append_generation(GenerationLog(log_path), generations, creatures, {2: creatures[2]})
+            generations.append([2, 3])
+            log = GenerationLog(log_path)
+            append_generation(log, generations, creatures, {3: creatures[3]})
+            self.assertEqual(list(log.read(2)['creatures']), [3])
+            self.assertEqual(load_generations(log_path)['generations'], generations)
+
+    def test_checkpoint_writer(self):
+        ''' Tests that the queued generations are written in order when the writer is closed '''
+        creatures = {i: {'identity': i} for i in range(3)}
+        generations = []
+        writer = CheckpointWriter(size=1)
+        with tempfile.TemporaryDirectory() as directory:
+            log = GenerationLog(os.path.join(directory, 'test.log'))
+            for i in range(3):
+                generations.append([i])
+                append_generation(log, generations, creatures, {i: creatures[i]}, writer)
+            writer.close()
+            self.assertEqual(load_generations(log.file_path)['generations'], generations)
+            self.assertFalse(os.path.exists(f'{log.index_path}.tmp'))
+
+            writer = CheckpointWriter()
+            writer.submit(log.write, None)
+            self.assertRaises(TypeError, writer.close)
+
+    def test_lazy_load(self):
+        ''' Tests that a lazily loaded log only reads the last generation until asked for more '''
+        with open('test_data/default.pickle', 'rb') as file:
+            data = pickle.load(file)
+        with tempfile.TemporaryDirectory() as directory:
+            log_path = convert_generations(shutil.copy('test_data/default.pickle', directory))
+            creature_index = GenerationLog(log_path).read_creature_index()
+            os.remove(f'{os.path.splitext(log_path)[0]}.cidx')
+            self.assertEqual(GenerationLog(log_path).read_creature_index(), creature_index)
+            lazy = load_generations(log_path, lazy=True)
+            creatures = lazy['creatures']
+            self.assertEqual(set(creatures.loaded), set(data['generations'][-1]))
+            self.assertEqual(lazy['creature_count'], data['creature_count'])
+            self.assertEqual(list(lazy['generations']), data['generations'])
+            self.assertEqual(dict(creatures), data['creatures'])
+
+            creatures[-1] = {'identity': -1}
+            lazy['generations'].append([-1])
+            self.assertEqual(len(creatures), len(data['creatures']) + 1)
+            self.assertEqual(lazy['generations'][-1], [-1])
+
+    def test_lineage_database(self):
+        ''' Tests that a database loads the same data and answers the lineage queries '''
+        with open('test_data/default.pickle', 'rb') as file:
+            data = pickle.load(file)
+        creatures = data['creatures']
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, 'default.db')
+            database = LineageDatabase(file_path)
+            write_generations(database, data['generations'], creatures, data['creature_count'])
+            self.assertEqual(load_generations(file_path), data)
+            lazy = load_generations(file_path, lazy=True)
+            self.assertEqual(dict(lazy['creatures']), creatures)
+            lazy['creatures'].database.close()
+
+            best = data['generations'][-1][0]
+            ancestors = []
+            parent = creatures[best].get('parent')
+            while parent is not None:
+                ancestors.append(parent)
+                parent = creatures[parent].get('parent')
+            self.assertEqual(database.best_lineage(), [best] + ancestors)
+            for ancestor in ancestors:
+                self.assertIn(best, database.descendants(ancestor))
+            survivors = [i for i in data['generations'][0] if i in data['generations'][1]]
+            self.assertEqual(database.survivors(0), survivors)
+            database.close()
+
+            database = LineageDatabase(os.path.join(directory, 'lineage.db'))
+            parents = {1: None, 2: 1, 3: 1, 4: 2, 5: 4}
+            database.append([1], {1: {'identity': 1, 'parent': None, 'fitness': 1.0}}, 1)
+            database.append([5, 3], {i: {'identity': i, 'parent': parents[i], 'fitness': 6.0 - i}
+                                     for i in range(2, 6)}, 5)
+            self.assertEqual(database.ancestors(5), [4, 2, 1])
+            self.assertEqual(database.descendants(2), [4, 5])
+            self.assertEqual(database.best_lineage(), [5, 4, 2, 1])
+            self.assertEqual(database.read_generations(), [[1], [5, 3]])
+            database.close()
+
+    def test_compact_creatures(self):
+        ''' Tests that compaction keeps the last generations and every ancestor of the live ones '''
+        parents = {1: None, 2: None, 3: 1, 4: 2, 5: 3, 6: None, 7: 5}
+        creatures = {i: {'identity': i, 'parent': parent} for i, parent in parents.items()}
+        generations = [[1, 2], [3, 4], [5, 6], [7, 6]]
+        self.assertEqual(compact_creatures(generations, creatures, keep=None), 0)
+        self.assertEqual(compact_creatures(generations, creatures, keep=2), 2)
+        self.assertEqual(set(creatures), {1, 3, 5, 6, 7})
+
+    def test_retained_identities(self):
+        ''' Tests that a resumed run loads the creatures of its last compaction without walking
+        the ancestors '''
+        parents = {1: None, 2: None, 3: 1, 4: 2, 5: 3, 6: None, 7: 5, 8: 6}
+        creatures = {i: {'identity': i, 'parent': parent} for i, parent in parents.items()}
+        generations = [[1, 2], [3, 4], [5, 6], [7, 6], [8, 7]]
+        with tempfile.TemporaryDirectory() as directory:
+            log_path = os.path.join(directory, 'test.log')
+            self.assertEqual(load_retained_identities(log_path, generations, creatures, keep=2),
+                             {1, 3, 5, 6, 7, 8})
+
+            write_retained(get_retained_path(log_path), 4, [1, 3, 5, 6, 7])
+            # The ancestors are not read again
+            self.assertEqual(load_retained_identities(log_path, generations, {}, keep=2),
+                             {1, 3, 5, 6, 7, 8})
+            # A compaction that is ahead of the saved generations is ignored
+            self.assertEqual(load_retained_identities(log_path, generations[:3], creatures,
+                                                      keep=2), {1, 3, 4, 5, 6})
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,49 @@
+''' Module to write checkpoints in the background while the training continues '''
+import atexit
+import threading
+from queue import Queue
+
+from settings import CHECKPOINT_QUEUE_SIZE
+
+
+class CheckpointWriter:
+    ''' Thread that runs the queued writes in order, the queue is bounded so the training waits
+    when the disk can not keep up '''
+
+    def __init__(self, size=CHECKPOINT_QUEUE_SIZE):
+        self.queue = Queue(maxsize=size)
+        self.error = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def run(self):
+        ''' Runs the queued writes until it gets None '''
+        while True:
+            task = self.queue.get()
+            if task is None:
+                return
+            function, args = task
+            try:
+                if self.error is None:
+                    function(*args)
+            except Exception as error:  # pylint: disable=broad-except
+                self.error = error
+
+    def submit(self, function, *args):
+        ''' Queues a write of snapshots that are not changed afterwards '''
+        self.check()
+        self.queue.put((function, args))
+
+    def check(self):
+        ''' Raises the error of a failed write '''
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def close(self):
+        ''' Waits for the queued writes to finish '''
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        self.check()
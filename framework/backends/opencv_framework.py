@@ -36,7 +36,7 @@ import cv2
 import numpy as np
 
 import framework
-from framework import FrameworkBase, fwSettings
+from framework import FrameworkBase
 
 from Box2D import b2DrawExtended, b2Vec2
 
@@ -201,10 +201,10 @@ framework.Keys = OpencvKeys
 
 class OpencvFramework(FrameworkBase):
 
-    def __init__(self, w=640, h=480, resizable=False):
-        super(OpencvFramework, self).__init__()
+    def __init__(self, w=640, h=480, resizable=False, settings=None):
+        super(OpencvFramework, self).__init__(settings)
 
-        if fwSettings.onlyInit:  # testing mode doesn't initialize opencv
+        if self.settings.onlyInit:  # testing mode doesn't initialize opencv
             return
 
         self._viewZoom = 10.0
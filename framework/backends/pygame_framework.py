@@ -55,7 +55,6 @@ from pygame.locals import (QUIT, KEYDOWN, KEYUP, MOUSEBUTTONDOWN,
                            MOUSEBUTTONUP, MOUSEMOTION, KMOD_LSHIFT)
 
 from ..framework import (FrameworkBase, Keys)
-from ..settings import fwSettings
 from Box2D import (b2DrawExtended, b2Vec2)
 
 GUIEnabled = False
@@ -226,11 +225,11 @@ class PygameFramework(FrameworkBase):
         self.gui_table = None
         self.setup_keys()
 
-    def __init__(self):
-        super(PygameFramework, self).__init__()
+    def __init__(self, settings=None):
+        super(PygameFramework, self).__init__(settings)
 
         self.__reset()
-        if fwSettings.onlyInit:  # testing mode doesn't initialize pygame
+        if self.settings.onlyInit:  # testing mode doesn't initialize pygame
             return
 
         # Pygame Initialization
@@ -43,7 +43,6 @@ from pyglet import gl
 
 from Box2D import (b2Vec2, b2Draw)
 from ..framework import (FrameworkBase, Keys)
-from ..settings import fwSettings
 
 
 class grBlended (pyglet.graphics.Group):
@@ -484,12 +483,12 @@ class PygletFramework(FrameworkBase):
 
         self.setup_keys()
 
-    def __init__(self):
-        super(PygletFramework, self).__init__()
+    def __init__(self, settings=None):
+        super(PygletFramework, self).__init__(settings)
 
         self.__reset()
 
-        if fwSettings.onlyInit:  # testing mode doesn't initialize Pyglet
+        if self.settings.onlyInit:  # testing mode doesn't initialize Pyglet
             return
 
         print('Initializing Pyglet framework...')
@@ -625,12 +625,12 @@ class Pyqt4Framework(FrameworkBase):
         self.window = None
         self.setup_keys()
 
-    def __init__(self):
-        super(Pyqt4Framework, self).__init__()
+    def __init__(self, settings=None):
+        super(Pyqt4Framework, self).__init__(settings)
 
         self.__reset()
 
-        if settings.fwSettings.onlyInit:  # testing mode doesn't initialize Pyqt4
+        if self.settings.onlyInit:  # testing mode doesn't initialize Pyqt4
             return
 
         global app
@@ -1,16 +1,17 @@
 """
 The framework's base is FrameworkBase. See its help for more information.
 """
-from . import backends
+import importlib
+from copy import copy
+from functools import lru_cache
 from time import time
-import pygame
 from Box2D import (b2World, b2AABB, b2CircleShape, b2Color, b2Vec2)
 from Box2D import (b2ContactListener, b2DestructionListener, b2DrawExtended)
 from Box2D import (b2Fixture, b2FixtureDef, b2Joint)
 from Box2D import (b2GetPointStates, b2QueryCallback, b2Random)
 from Box2D import (b2_addState, b2_dynamicBody, b2_epsilon, b2_persistState)
 
-from .settings import fwSettings
+from .settings import load_settings
 import numpy as np
 from maths.maths import get_position_of_creature, get_fitness
 
@@ -67,9 +68,8 @@ class FrameworkBase(b2ContactListener):
       You should derive your class from this one to implement your own tests.
       See empty.py or any of the other tests for more information.
     * Do NOT want to implement your own renderer:
-      You should derive your class from Framework. The renderer chosen in
-      fwSettings (see settings.py) or on the command line will automatically
-      be used for your test.
+      Pass your class to main. The renderer chosen in the settings (see
+      settings.py) is added as its base when it runs.
     """
     name = "None"
     description = []
@@ -97,7 +97,6 @@ class FrameworkBase(b2ContactListener):
         self.world = None
         self.bomb = None
         self.mouseJoint = None
-        self.settings = fwSettings
         self.bombSpawning = False
         self.bombSpawnPoint = None
         self.mouseWorld = None
@@ -108,9 +107,10 @@ class FrameworkBase(b2ContactListener):
         self.destructionListener = None
         self.renderer = None
 
-    def __init__(self):
+    def __init__(self, settings=None):
         super(FrameworkBase, self).__init__()
         self.__reset()
+        self.settings = load_settings() if settings is None else settings
 
         # Box2D Initialization
         self.world = b2World(gravity=(0, -10), doSleep=True)
@@ -514,12 +514,44 @@ class FrameworkBase(b2ContactListener):
         pass
 
 
-def main(test_class, render, *args):
+@lru_cache(maxsize=None)
+def get_framework(backend):
     """
-    Loads the test class and executes it.
+    Imports the framework class of a back-end, falling back on pygame.
     """
-    test = test_class(*args)
-    if fwSettings.onlyInit:
+    # Your framework classes should follow this format. If it is the 'foobar'
+    # framework, then your file should be 'backends/foobar_framework.py' and you
+    # should have a class 'FoobarFramework' that subclasses FrameworkBase. Ensure
+    # proper capitalization for portability.
+    try:
+        framework_module = importlib.import_module(
+            '.backends.%s_framework' % backend.lower(), __package__)
+        return getattr(framework_module, '%sFramework' % backend.capitalize())
+    except Exception as ex:
+        print('Unable to import the back-end %s: %s' % (backend, ex))
+        print('Attempting to fall back on the pygame back-end.')
+
+        from .backends.pygame_framework import PygameFramework
+        return PygameFramework
+
+
+@lru_cache(maxsize=None)
+def get_test_class(test_class, backend):
+    """
+    Returns the test class with the framework of a back-end as its base.
+    """
+    return type(test_class.__name__, (test_class, get_framework(backend)), {})
+
+
+def main(test_class, render, *args, settings=None):
+    """
+    Loads the test class and executes it. The settings are copied, so the test
+    can change them, and are loaded from the defaults and the config file when
+    they are not given.
+    """
+    settings = load_settings() if settings is None else copy(settings)
+    test = get_test_class(test_class, settings.backend)(*args, settings=settings)
+    if settings.onlyInit:
         return
     test.start_time = time()
     test.render = render
@@ -528,6 +560,8 @@ def main(test_class, render, *args):
     for key, body in test.creature_bodies.items():
         fitness[key] = body.position[0]
     test.reset_all()
+
+    import pygame
     pygame.quit()
     return fitness
 
@@ -536,21 +570,3 @@ if __name__ == '__main__':
     print('Please run one of the examples directly. This is just the base for '
           'all of the frameworks.')
     exit(1)
-
-
-# Your framework classes should follow this format. If it is the 'foobar'
-# framework, then your file should be 'backends/foobar_framework.py' and you
-# should have a class 'FoobarFramework' that subclasses FrameworkBase. Ensure
-# proper capitalization for portability.
-
-try:
-    framework_name = '%s_framework' % (fwSettings.backend.lower())
-    __import__('backends', globals(), fromlist=[framework_name], level=1)
-    framework_module = getattr(backends, framework_name)
-    Framework = getattr(framework_module,
-                        '%sFramework' % fwSettings.backend.capitalize())
-except Exception as ex:
-    print('Unable to import the back-end %s: %s' % (fwSettings.backend, ex))
-    print('Attempting to fall back on the pygame back-end.')
-
-    from .backends.pygame_framework import PygameFramework as Framework
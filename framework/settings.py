@@ -21,8 +21,12 @@
 # 3. This notice may not be removed or altered from any source distribution.
 
 
+import json
+import os
 from optparse import OptionParser
 
+from settings import FRAMEWORK_CONFIG
+
 
 class fwSettings(object):
     # The default backend to use in (can be: pyglet, pygame, etc.)
@@ -87,33 +91,52 @@ sliders = [
 ]
 
 
-parser = OptionParser()
-list_options = [i for i in dir(fwSettings)
-                if not i.startswith('_')]
+def get_parser(settings=fwSettings):
+    """ Returns a parser of the command line options, with the values of settings as the
+    defaults """
+    parser = OptionParser()
+    list_options = [i for i in dir(fwSettings)
+                    if not i.startswith('_')]
+
+    for opt_name in list_options:
+        value = getattr(settings, opt_name)
+        if isinstance(getattr(fwSettings, opt_name), bool):
+            if value:
+                parser.add_option('', '--no-' + opt_name, dest=opt_name,
+                                  default=value, action='store_' +
+                                      str(not value).lower(),
+                                  help="don't " + opt_name)
+            else:
+                parser.add_option('', '--' + opt_name, dest=opt_name, default=value,
+                                  action='store_' + str(not value).lower(),
+                                  help=opt_name)
 
-for opt_name in list_options:
-    value = getattr(fwSettings, opt_name)
-    if isinstance(value, bool):
-        if value:
-            parser.add_option('', '--no-' + opt_name, dest=opt_name,
-                              default=value, action='store_' +
-                                  str(not value).lower(),
-                              help="don't " + opt_name)
         else:
+            if isinstance(value, int):
+                opttype = 'int'
+            elif isinstance(value, float):
+                opttype = 'float'
+            else:
+                opttype = 'string'
             parser.add_option('', '--' + opt_name, dest=opt_name, default=value,
-                              action='store_' + str(not value).lower(),
-                              help=opt_name)
-
-    else:
-        if isinstance(value, int):
-            opttype = 'int'
-        elif isinstance(value, float):
-            opttype = 'float'
-        else:
-            opttype = 'string'
-        parser.add_option('', '--' + opt_name, dest=opt_name, default=value,
-                          type=opttype,
-                          help='sets the %s option' % (opt_name,))
-
-
-fwSettings, args = parser.parse_args()
+                              type=opttype,
+                              help='sets the %s option' % (opt_name,))
+    return parser
+
+
+def load_settings(args=(), config_path=FRAMEWORK_CONFIG):
+    """ Returns new settings, the defaults of fwSettings are overridden by the JSON
+    file at config_path when it exists and then by the command line options in args.
+    Nothing is read from sys.argv unless it is given as args """
+    settings = fwSettings()
+    if config_path is not None and os.path.exists(config_path):
+        with open(config_path) as file:
+            for name, value in json.load(file).items():
+                if name.startswith('_') or not hasattr(fwSettings, name):
+                    raise ValueError('Unknown framework setting %s in %s' %
+                                     (name, config_path))
+                setattr(settings, name, value)
+    options, _ = get_parser(settings).parse_args(list(args))
+    for name, value in vars(options).items():
+        setattr(settings, name, value)
+    return settings
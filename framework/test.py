@@ -0,0 +1,43 @@
+"Module to perform unittest"
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from .settings import fwSettings, load_settings
+
+
+class SettingsTestCase(unittest.TestCase):
+    "Class that contains test cases for framework settings"
+
+    def test_load_settings(self):
+        ''' Tests that the config file overrides the defaults and the options override both '''
+        with tempfile.TemporaryDirectory() as directory:
+            config_path = os.path.join(directory, 'framework.json')
+            with open(config_path, 'w') as file:
+                json.dump({'hz': 30.0, 'drawJoints': False, 'backend': 'pyglet'}, file)
+
+            settings = load_settings(config_path=config_path)
+            self.assertEqual((settings.hz, settings.drawJoints, settings.backend),
+                             (30.0, False, 'pyglet'))
+            settings = load_settings(['--hz', '120', '--drawJoints'], config_path)
+            self.assertEqual((settings.hz, settings.drawJoints, settings.backend),
+                             (120.0, True, 'pyglet'))
+            self.assertEqual(load_settings(config_path=None).hz, fwSettings.hz)
+
+            with open(config_path, 'w') as file:
+                json.dump({'unknown': 1}, file)
+            self.assertRaises(ValueError, load_settings, (), config_path)
+
+    def test_import_arguments(self):
+        ''' Tests that importing the environment ignores the arguments of the process '''
+        result = subprocess.run(
+            [sys.executable, '-c', 'import environment, sys; print(sorted(sys.modules))',
+             '--hz', 'foreign'], capture_output=True, text=True, check=True)
+        self.assertNotIn('pygame', result.stdout)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,7 @@ import tkinter as tk
 import threading
 import os
 import random
+from argparse import ArgumentParser
 from copy import copy
 
 from PIL import Image, ImageTk
@@ -12,15 +13,21 @@ from gui import Gui, ContextMenu, ScrollFrame
 from gui.utils import set_entry
 from environment import Environment
 from framework.framework import main as framework
-from reproduction import reproduce
+from framework.settings import load_settings
+from cache import FitnessCache
+from reproduction import reproduce, GenomeIndex
+from selection import select
 from analytics import show_analytics
 from creature import Creature
-from file import save_generations, load_generations
+from file import (
+    get_generation_log, get_file_storage, get_resumed_log, get_log_path, reserve_name,
+    append_generation, get_column_store, append_columns, load_generations, compact_creatures,
+    get_retained_path, write_retained, load_retained_identities, CheckpointWriter)
 from simulation import Simulation
 from util import get_default_name
+from config import RunConfig, add_arguments, get_config
 from settings import (
-    POPULATION_SIZE, SELECTION_SIZE, OFFSPRINGS_PER_SELECTION_SIZE, RANDOM_NEW_POPULATION_SIZE,
-    MIN_VERTICES_COUNT, MAX_VERTICES_COUNT, MAX_SIZE, K_COUNT)
+    MIN_VERTICES_COUNT, MAX_VERTICES_COUNT, MAX_SIZE, FITNESS_CACHE_PATH, COMPACTION_INTERVAL)
 
 COL_COUNT = 8
 
@@ -33,41 +40,65 @@ def create_directories():
 class Application(Gui):
     ''' Main gui class '''
 
-    def __init__(self, master):
+    def __init__(self, master, framework_settings=None, config=None):
         Gui.__init__(self, master, 'Evolution Simulator')
+        self.framework_settings = framework_settings
+        self.config = RunConfig() if config is None else config
+        self.storage = self.config.storage
         self.builder.get_object('train')['state'] = 'disabled'
         self.builder.get_object('find_fitness')['state'] = 'disabled'
         self.builder.get_object('find_fitness_no_gui')['state'] = 'disabled'
         self.builder.get_object('sort')['state'] = 'disabled'
         self.builder.get_object('do_selection')['state'] = 'disabled'
         self.builder.get_object('reproduce')['state'] = 'disabled'
-        set_entry(self.builder, 'save_as', get_default_name())
+        set_entry(self.builder, 'save_as', get_default_name(self.config.population_size))
+        set_entry(self.builder, 'workers', self.config.workers)
 
         self.scroll_frame = ScrollFrame(self.builder.get_object('creatures_frame'))
         self.scroll_frame.grid(sticky='nsew')
         for col in range(COL_COUNT):
             self.scroll_frame.view_port.columnconfigure(col, minsize=66)
-        for row in range(POPULATION_SIZE//COL_COUNT + 1):
+        for row in range(self.config.population_size//COL_COUNT + 1):
             self.scroll_frame.view_port.rowconfigure(row, minsize=106)
 
-        self.simulation = Simulation()
+        self.cache = FitnessCache(FITNESS_CACHE_PATH)
+        self.simulation = Simulation.from_config(self.config, self.cache)
         self.creatures = []
         self.serializable_creatures = {}
         self.generations = []
+        self.log = None
+        self.columns = None
+        self.writer = CheckpointWriter()
+        self.genomes = GenomeIndex()
 
     def create_generation(self):
         ''' Creates a generation file '''
         creatures = []
+        new_creatures = {}
         for creature in self.creatures:
             data = creature.get_data()
+            if self.serializable_creatures.get(creature.identity) != data:
+                new_creatures[creature.identity] = data
             self.serializable_creatures[creature.identity] = data
             creatures.append(creature.identity)
         self.generations.append(creatures)
-        save_generations(
-            self.generations,
-            self.serializable_creatures,
-            self.builder.get_object('save_as').get()
-        )
+        self.genomes.update(new_creatures.values())
+        name = self.builder.get_object('save_as').get()
+        if self.log is None or self.log.file_path != get_log_path(name, self.storage):
+            # Only a resumed run continues in existing files
+            name = reserve_name(name, self.storage)
+            set_entry(self.builder, 'save_as', name)
+        self.log = get_generation_log(self.log, name, self.storage)
+        append_generation(self.log, self.generations, self.serializable_creatures,
+                          new_creatures, self.writer)
+        self.columns = get_column_store(self.columns, name)
+        append_columns(self.columns, self.generations, self.serializable_creatures, self.writer)
+        self.writer.submit(self.cache.write, self.cache.snapshot())
+        if len(self.generations) % COMPACTION_INTERVAL == 0:
+            if compact_creatures(self.generations, self.serializable_creatures):
+                self.genomes = GenomeIndex(self.serializable_creatures.values())
+            self.writer.submit(write_retained, get_retained_path(self.log.file_path),
+                               len(self.generations), list(self.serializable_creatures))
 
     def create_creature(self, creature, i):
         ''' Creates a single creature '''
@@ -75,13 +106,13 @@ class Application(Gui):
         image = creature.get_image(7)
         pillow_image = Image.fromarray(image)
         imgtk = ImageTk.PhotoImage(image=pillow_image)
-        creature.frame.grid(row=i//COL_COUNT, column=i % COL_COUNT)
-        creature.set_description()
-        creature.right_click = ContextMenu(self.master, [
+        creature.view.frame.grid(row=i//COL_COUNT, column=i % COL_COUNT)
+        creature.view.set_description(creature)
+        creature.view.right_click = ContextMenu(self.master, [
             {'label': 'Test fitness', 'command': lambda c=creature: self.test_fitness(c)}, ])
-        creature.description.grid(sticky='w')
-        panel = tk.Label(creature.frame)
-        panel.bind('<Button-3>', creature.right_click.popup)
+        creature.view.description.grid(sticky='w')
+        panel = tk.Label(creature.view.frame)
+        panel.bind('<Button-3>', creature.view.right_click.popup)
         panel.grid()
         panel.imgtk = imgtk
         panel.config(image=imgtk)
@@ -123,19 +154,23 @@ class Application(Gui):
         if self.generations == []:
             easygui.msgbox('There is no data to show', 'Error')
             return
-        show_analytics(self.get_generation()-1, self.generations, self.serializable_creatures)
+        columns = self.columns
+        if columns is not None and len(columns) != len(self.generations):
+            columns = None
+        show_analytics(self.get_generation()-1, self.generations, self.serializable_creatures,
+                       columns)
 
     def threaded_create(self):
         ''' Creates an initial population of creatures '''
         self.builder.get_object('progress')['value'] = 0
         self.builder.get_object('create')['state'] = 'disabled'
-        for i in range(POPULATION_SIZE):
+        for i in range(self.config.population_size):
             creature = Creature(
                 n=random.randint(MIN_VERTICES_COUNT, MAX_VERTICES_COUNT),
                 view_port=self.scroll_frame.view_port,
                 size=MAX_SIZE)
             self.create_creature(creature, i)
-            progress = i * 100 // POPULATION_SIZE
+            progress = i * 100 // self.config.population_size
             self.builder.get_object('progress')['value'] = progress
         self.builder.get_object('progress')['value'] = 0
         self.builder.get_object('find_fitness')['state'] = 'active'
@@ -146,22 +181,30 @@ class Application(Gui):
         self.builder.get_object('find_fitness')['state'] = 'disabled'
         self.builder.get_object('find_fitness_no_gui')['state'] = 'disabled'
         fitness = framework(
-            Environment, render, f'Generation #{self.get_generation()}', self.creatures)
+            Environment, render, f'Generation #{self.get_generation()}', self.creatures,
+            self.config, settings=self.framework_settings)
         for creature in self.creatures:
             creature.fitness = fitness[creature.identity]
-            creature.set_description()
-            creature.description.grid(sticky='w')
+            creature.view.set_description(creature)
+            creature.view.description.grid(sticky='w')
         self.builder.get_object('sort')['state'] = 'active'
 
     def threaded_find_fitness_no_gui(self):
         ''' Finds the fitness of all the creatures with render off '''
         self.builder.get_object('find_fitness')['state'] = 'disabled'
         self.builder.get_object('find_fitness_no_gui')['state'] = 'disabled'
+        try:
+            self.simulation.set_workers(int(self.builder.get_object('workers').get()))
+        except ValueError:
+            easygui.msgbox('Make sure the number of workers is an integer', 'Error')
+            self.builder.get_object('find_fitness')['state'] = 'active'
+            self.builder.get_object('find_fitness_no_gui')['state'] = 'active'
+            return
         fitness = self.simulation.simulate(self.creatures, self.builder)
         for creature in self.creatures:
             creature.fitness = fitness[creature.identity]
-            creature.set_description()
-            creature.description.grid(sticky='w')
+            creature.view.set_description(creature)
+            creature.view.description.grid(sticky='w')
         self.builder.get_object('progress')['value'] = 0
         self.builder.get_object('sort')['state'] = 'active'
 
@@ -176,8 +219,8 @@ class Application(Gui):
 
         self.creatures.sort(key=lambda c: c.fitness, reverse=True)
         for i, creature in enumerate(self.creatures):
-            creature.frame.grid(row=i//COL_COUNT, column=i % COL_COUNT)
-            progress = i * 100 // POPULATION_SIZE
+            creature.view.frame.grid(row=i//COL_COUNT, column=i % COL_COUNT)
+            progress = i * 100 // self.config.population_size
             self.builder.get_object('progress')['value'] = progress
         self.create_generation()
         self.builder.get_object('progress')['value'] = 0
@@ -190,21 +233,17 @@ class Application(Gui):
         self.builder.get_object('do_selection')['state'] = 'disabled'
         self.builder.get_object('train')['state'] = 'disabled'
 
-        selected_population = []
-        creatures = copy(self.creatures)
-        for _ in range(SELECTION_SIZE):
-            selected = max(random.choices(creatures, k=K_COUNT), key=lambda c: c.fitness)
-            selected_population.append(selected)
-            creatures.remove(selected)
-
-        for i, creature in enumerate(copy(self.creatures)):
-            if creature not in selected_population:
-                creature.frame.grid_forget()
-                creature.right_click.menu.destroy()
-                creature.description.destroy()
-                creature.frame.destroy()
-                self.creatures.remove(creature)
-            progress = i * 100 // POPULATION_SIZE
+        fitness = [creature.fitness for creature in self.creatures]
+        selected = set(select(fitness, self.config.selection_size, self.config.selection,
+                              k=self.config.k_count).tolist())
+        creatures = self.creatures
+        self.creatures = []
+        for i, creature in enumerate(creatures):
+            if i in selected:
+                self.creatures.append(creature)
+            else:
+                creature.view.destroy()
+            progress = i * 100 // self.config.population_size
             self.builder.get_object('progress')['value'] = progress
         self.builder.get_object('progress')['value'] = 0
         self.builder.get_object('reproduce')['state'] = 'active'
@@ -219,17 +258,18 @@ class Application(Gui):
         self.creatures = []
         k = 0
         for i, creature in enumerate(creatures):
-            for _ in range(OFFSPRINGS_PER_SELECTION_SIZE):
+            for _ in range(self.config.offsprings_per_selection_size):
                 self.creatures.append(creature)
-                creature.frame.grid(row=k//COL_COUNT, column=k % COL_COUNT)
+                creature.view.frame.grid(row=k//COL_COUNT, column=k % COL_COUNT)
                 k += 1
-                offspring = reproduce(creature, self.serializable_creatures)
+                offspring = reproduce(creature, self.serializable_creatures,
+                                      genomes=self.genomes)
                 self.create_creature(offspring, k)
                 k += 1
             progress = i * 100 // total_creatures
             self.builder.get_object('progress')['value'] = progress
 
-        for i in range(k, k+RANDOM_NEW_POPULATION_SIZE):
+        for i in range(k, k+self.config.random_new_population_size):
             creature = Creature(
                 n=random.randint(MIN_VERTICES_COUNT, MAX_VERTICES_COUNT),
                 view_port=self.scroll_frame.view_port,
@@ -264,9 +304,12 @@ class Application(Gui):
         file_path = easygui.fileopenbox('Load a generations file', default='./data/generations/')
         if file_path is None:
             return
-        data = load_generations(file_path)
+        data = load_generations(file_path, lazy=True)
         self.serializable_creatures = data['creatures']
         self.generations = data['generations']
+        retained = load_retained_identities(file_path, self.generations,
+                                            self.serializable_creatures)
+        self.genomes = GenomeIndex(self.serializable_creatures[i] for i in retained)
         self.builder.get_object('details')['text'] = f'Generation #{len(self.generations)+1}'
         self.creatures = []
         for i, creature_id in enumerate(self.generations[-1]):
@@ -274,6 +317,10 @@ class Application(Gui):
             creature = Creature(**creature_data, view_port=self.scroll_frame.view_port)
             self.create_creature(creature, i)
         set_entry(self.builder, 'save_as', os.path.basename(os.path.splitext(file_path)[0]))
+        # Continues in the loaded file, a legacy pickle is saved with the selected storage
+        self.storage = get_file_storage(file_path, self.config.storage)
+        self.log = get_resumed_log(file_path)
+        self.columns = None
         self.builder.get_object('create')['state'] = 'disabled'
         self.builder.get_object('train')['state'] = 'active'
         self.builder.get_object('find_fitness')['state'] = 'disabled'
@@ -284,7 +331,8 @@ class Application(Gui):
 
     def test_fitness(self, creature: Creature):
         ''' Tests the fitness of a single creature with render on '''
-        fitness = framework(Environment, True, f'Generation #{self.get_generation()}', [creature])
+        fitness = framework(Environment, True, f'Generation #{self.get_generation()}', [creature],
+                            self.config, settings=self.framework_settings)
         easygui.msgbox(
             f'Fitness of creature '
             f'#{creature.identity}: {"{:.2f}".format(fitness[creature.identity])}',
@@ -297,8 +345,19 @@ class Application(Gui):
 
 def main():
     ''' Main function of the script '''
+    parser = ArgumentParser(description='Script to train the creatures using gui',
+                            allow_abbrev=False)
+    add_arguments(parser)
+    # The other options are framework options, like --backend or --hz, that override the
+    # framework config file
+    args, framework_args = parser.parse_known_args()
+    try:
+        config = get_config(args)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+
     root = tk.Tk()
-    Application(root)
+    Application(root, load_settings(framework_args), config)
     root.mainloop()
 
 
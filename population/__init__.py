@@ -0,0 +1,140 @@
+''' Module to store a population as parallel arrays for the training loop '''
+import random
+
+import numpy as np
+
+from creature import Creature, create_vertices, create_edges
+from reproduction.batch import (
+    encode_vertices, encode_edge_orders, get_edge_masks, get_edge_orders, decode_vertices,
+    decode_edges, breed)
+
+
+class Individual:
+    ''' Lightweight creature with the attributes that the simulation uses '''
+    __slots__ = ('identity', 'n', 'size', 'vertices', 'edges', 'fitness', 'parent')
+
+    def __init__(self, identity, n, size, vertices, edges, fitness=0.0, parent=None):
+        self.identity = identity
+        self.n = n
+        self.size = size
+        self.vertices = vertices
+        self.edges = edges
+        self.fitness = fitness
+        self.parent = parent
+
+    def get_data(self):
+        ''' Returns a picklable data like Creature.get_data '''
+        return {
+            'n': self.n,
+            'identity': self.identity,
+            'size': self.size,
+            'vertices': self.vertices,
+            'edges': self.edges,
+            'fitness': self.fitness,
+            'parent': self.parent,
+        }
+
+
+def create_identities(count):
+    ''' Returns count new identities from the creature counter '''
+    identities = np.arange(Creature.count + 1, Creature.count + count + 1, dtype=np.int64)
+    Creature.count += count
+    return identities
+
+
+class Population:
+    ''' Struct of arrays with the identity, fitness, parent (-1 when there is none), vertex count,
+    size, vertices and edges of every creature. The vertices are padded up to MAX_VERTICES_COUNT
+    and the edges are the pair indices of reproduction.batch in the order of the creature, padded
+    with -1. Indexing with a slice gives views of the arrays, indexing with an index array or a
+    boolean mask gives a new population '''
+
+    def __init__(self, identity, fitness, parent, n, size, vertices, edges):
+        self.identity = identity
+        self.fitness = fitness
+        self.parent = parent
+        self.n = n
+        self.size = size
+        self.vertices = vertices
+        self.edges = edges
+
+    @classmethod
+    def from_data(cls, creatures):
+        ''' Returns the population of the data of some creatures '''
+        return cls(
+            np.array([data['identity'] for data in creatures], dtype=np.int64),
+            np.array([data['fitness'] for data in creatures], dtype=np.float64),
+            np.array([-1 if data.get('parent') is None else data['parent']
+                      for data in creatures], dtype=np.int64),
+            np.array([data['n'] for data in creatures], dtype=np.int64),
+            np.array([data['size'] for data in creatures], dtype=np.int64),
+            encode_vertices([data['vertices'] for data in creatures]),
+            encode_edge_orders([data['edges'] for data in creatures]),
+        )
+
+    @classmethod
+    def from_creatures(cls, creatures):
+        ''' Returns the population of some creatures '''
+        return cls.from_data([creature.get_data() for creature in creatures])
+
+    @classmethod
+    def create_random(cls, count, size, min_n, max_n, rng=random):
+        ''' Returns a population of random creatures, the random values are drawn in the same
+        order as creating Creature objects '''
+        n = np.empty(count, dtype=np.int64)
+        vertices, edges = [], []
+        for i in range(count):
+            n[i] = count_n = rng.randint(min_n, max_n)
+            vertices.append(create_vertices(count_n, size, rng))
+            edges.append(create_edges(count_n, rng))
+        return cls(create_identities(count), np.zeros(count), np.full(count, -1, dtype=np.int64),
+                   n, np.full(count, size, dtype=np.int64), encode_vertices(vertices),
+                   encode_edge_orders(edges))
+
+    @classmethod
+    def concatenate(cls, populations):
+        ''' Returns the populations one after another '''
+        return cls(*(np.concatenate([getattr(population, name) for population in populations])
+                     for name in ('identity', 'fitness', 'parent', 'n', 'size', 'vertices',
+                                  'edges')))
+
+    def breed(self, offsprings, rng=random, genomes=None):
+        ''' Returns the offsprings of every creature in one batch, ordered by parent, their edges
+        are in the bit order of Genome '''
+        arrays = breed({'n': self.n, 'size': self.size, 'vertices': self.vertices,
+                        'edges': get_edge_masks(self.edges)}, offsprings, rng, genomes)
+        count = len(arrays['n'])
+        return Population(create_identities(count), np.zeros(count),
+                          np.repeat(self.identity, offsprings), arrays['n'], arrays['size'],
+                          arrays['vertices'], get_edge_orders(arrays['edges']))
+
+    def ranking(self):
+        ''' Returns the indices of the creatures from the fittest to the least fit '''
+        return np.argsort(-self.fitness, kind='stable')
+
+    def get_data(self, i):
+        ''' Returns the data of a creature like Creature.get_data '''
+        return self.get_individual(i).get_data()
+
+    def get_individual(self, i):
+        ''' Returns a creature as an individual '''
+        n = int(self.n[i])
+        parent = int(self.parent[i])
+        return Individual(int(self.identity[i]), n, int(self.size[i]),
+                          decode_vertices(self.vertices[i], n), decode_edges(self.edges[i]),
+                          float(self.fitness[i]), None if parent == -1 else parent)
+
+    def get_individuals(self):
+        ''' Returns all the creatures as individuals for the simulation '''
+        return [self.get_individual(i) for i in range(len(self))]
+
+    def get_creatures(self, view_port=None):
+        ''' Returns all the creatures as Creature objects, which the gui needs for its widgets '''
+        return [Creature(**self.get_data(i), view_port=view_port) for i in range(len(self))]
+
+    def __getitem__(self, key):
+        return Population(self.identity[key], self.fitness[key], self.parent[key], self.n[key],
+                          self.size[key], self.vertices[key], self.edges[key])
+
+    def __len__(self):
+        return len(self.identity)
@@ -0,0 +1,68 @@
+"Module to perform unittest"
+import random
+import unittest
+
+import numpy as np
+
+from creature import Creature
+from creature.genome import get_edge_bit
+from file import load_generations
+from reproduction import GenomeIndex
+
+from . import Population
+
+
+class PopulationTestCase(unittest.TestCase):
+    "Class that contains test cases for population package"
+
+    def test_create_random(self):
+        ''' Tests that a random population matches creating Creature objects with the same seed '''
+        population = Population.create_random(20, 7, 4, 7, random.Random(4))
+        rng = random.Random(4)
+        for i in range(len(population)):
+            creature = Creature(n=rng.randint(4, 7), size=7, rng=rng)
+            data = population.get_data(i)
+            self.assertEqual(data['vertices'], creature.vertices)
+            self.assertEqual(data['edges'], creature.edges)
+            self.assertIsNone(data['parent'])
+        self.assertEqual(len(set(population.identity.tolist())), 20)
+
+    def test_indexing(self):
+        ''' Tests the ranking, the views of a slice and the copies of an index array '''
+        data = load_generations('test_data/default.pickle')
+        creatures = [data['creatures'][i] for i in data['generations'][-1]]
+        population = Population.from_data(creatures)
+        self.assertEqual(population.get_data(0), dict(creatures[0],
+                                                      parent=creatures[0].get('parent')))
+
+        population.fitness[:] = np.arange(len(population))
+        ranked = population[population.ranking()]
+        self.assertEqual(ranked.identity.tolist(), population.identity.tolist()[::-1])
+        head = population[:10]
+        head.fitness[0] = -1.0
+        self.assertEqual(population.fitness[0], -1.0)
+        picked = population[np.array([0, 1])]
+        picked.fitness[0] = -2.0
+        self.assertEqual(population.fitness[0], -1.0)
+
+        both = Population.concatenate([head, picked])
+        self.assertEqual(len(both), 12)
+        self.assertEqual(both.identity[10:].tolist(), population.identity[:2].tolist())
+        self.assertEqual(both.get_data(11), population.get_data(1))
+
+    def test_breed(self):
+        ''' Tests that the offsprings are ordered by parent and avoid indexed genomes '''
+        data = load_generations('test_data/default.pickle')
+        population = Population.from_data(
+            [data['creatures'][i] for i in data['generations'][-1]])
+        genomes = GenomeIndex(data['creatures'].values())
+        offsprings = population.breed(2, random.Random(2), genomes)
+        self.assertEqual(offsprings.parent.tolist(), np.repeat(population.identity, 2).tolist())
+        self.assertEqual(offsprings.n.tolist(), np.repeat(population.n, 2).tolist())
+        for offspring in offsprings.get_individuals():
+            self.assertFalse(genomes.has_genome(offspring.vertices, offspring.edges))
+            self.assertEqual(offspring.edges, sorted(offspring.edges, key=get_edge_bit))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,78 +1,87 @@
 ''' Module to create offsprings of a creature '''
-from random import randint, choice, shuffle
+import random
 from copy import copy
 
-from creature import Creature
-from creature import get_all_possible_edges
-
-from settings import MAX_EDGE_CHANGE_COUNT, MAX_VERTICES_PIXEL_CHANGE
-
-
-def change_structure(offspring: Creature):
-    ''' Changes the structure of a offspring and returns it '''
-    all_edges = get_all_possible_edges(offspring.n)
-    add_list = all_edges - set(offspring.edges)
-    remove_list = set(filter(lambda edge: edge[0] + 1 != edge[1], offspring.edges))
-    add = choice([True, False]) if add_list != set() else False
-    if remove_list == set():
-        add = True
-
-    if add:
-        # Adding edges logic
-        edges = set(offspring.edges)
-        for _ in range(randint(1, MAX_EDGE_CHANGE_COUNT)):
-            if add_list == set():
-                break
-            random_edge = choice(list(add_list))
-            add_list -= {(random_edge)}
-            edges = edges.union({(random_edge)})
-        offspring.edges = list(edges)
-    else:
-        # Removing edges logic
-        edges = set(offspring.edges)
-        for _ in range(randint(1, MAX_EDGE_CHANGE_COUNT)):
-            if remove_list == set():
-                break
-            random_edge = choice(list(remove_list))
-            remove_list -= {(random_edge)}
-            edges = edges - {random_edge}
-        offspring.edges = list(edges)
-
-    vertex = offspring.vertices[0]
-    x_del = randint(1, MAX_VERTICES_PIXEL_CHANGE)
-    y_del = randint(1, MAX_VERTICES_PIXEL_CHANGE)
-    x = vertex[0] + x_del * choice([-1, 1])
-    x = max(0, x)
-    x = min(offspring.size-1, x)
-    y = vertex[1] + y_del * choice([-1, 1])
-    y = max(0, y)
-    y = min(offspring.size-1, y)
-    offspring.vertices[0] = (x, y)
+import numpy as np
+
+from creature import Creature, Genome
+from creature.genome import get_edge_mask, get_mask_edges, mutate_edges, move_vertex
+from settings import MAX_REPRODUCTION_ATTEMPTS
+from .batch import get_genome_key
+
+
+def change_structure(offspring: Creature, rng=random):
+    ''' Changes the structure of a offspring and returns it, like Genome.mutate '''
+    n = len(offspring.vertices)
+    offspring.edges = get_mask_edges(mutate_edges(get_edge_mask(offspring.edges), n, rng), n)
+    offspring.vertices[0] = move_vertex(offspring.vertices[0], offspring.size, rng)
     return offspring
 
 
-def reproduce(creature: Creature, serializable_creatures: dict):
-    ''' Creates a offsprings of a creature by adding or removing some edges '''
-    offspring = Creature(n=creature.n, view_port=creature.view_port, size=creature.size)
-    offspring.vertices = copy(creature.vertices)
-    offspring.edges = copy(creature.edges)
-    offspring.parent = creature.identity
+class GenomeIndex:
+    ''' Set of the genome keys of the saved creatures, which include every ancestor of the live
+    creatures. The keys are also kept in a sorted array to check whole batches at once '''
+
+    def __init__(self, creatures=()):
+        self.keys = set()
+        self.array = np.empty(0, dtype=np.int64)
+        self.update(creatures)
+
+    def update(self, creatures):
+        ''' Adds the genomes of the data of some creatures '''
+        keys = [get_genome_key(data['vertices'], data['edges']) for data in creatures]
+        self.keys.update(keys)
+        # Timsort merges the sorted keys with the sorted new keys in linear time
+        self.array = np.sort(np.concatenate([self.array, np.sort(np.array(keys, dtype=np.int64))]),
+                             kind='stable')
+
+    def has_genome(self, vertices, edges):
+        ''' Returns whether a genome is in the index '''
+        return get_genome_key(vertices, edges) in self.keys
+
+    def has_genomes(self, keys):
+        ''' Returns whether each key of get_genome_keys is in the index '''
+        if not len(self.array):
+            return np.zeros(len(keys), dtype=bool)
+        positions = np.minimum(np.searchsorted(self.array, keys), len(self.array) - 1)
+        return self.array[positions] == keys
+
+    def __contains__(self, creature):
+        return self.has_genome(creature.vertices, creature.edges)
+
+    def __len__(self):
+        return len(self.keys)
+
+
+def reproduce(creature: Creature, serializable_creatures: dict, rng=random, genomes=None,
+              attempts=MAX_REPRODUCTION_ATTEMPTS):
+    ''' Creates a offsprings of a creature by adding or removing some edges, the offspring
+    differs from all its ancestors, or from every genome of the index when one is given. When
+    the attempts mutations all repeat a genome of the index, it only differs from its
+    ancestors '''
+    offspring = Creature(n=creature.n, view_port=creature.view_port, size=creature.size,
+                         vertices=copy(creature.vertices), edges=copy(creature.edges),
+                         parent=creature.identity)
 
-    offspring = change_structure(offspring)
-    parent_id = offspring.parent
-    parent = serializable_creatures[parent_id]
+    offspring = change_structure(offspring, rng)
+    if genomes is not None:
+        for _ in range(attempts):
+            if offspring not in genomes:
+                return offspring
+            offspring = change_structure(offspring, rng)
 
-    while True:
-        if parent is None:
+    genome = Genome.from_lists(offspring.vertices, offspring.edges)
+    vertices = genome.get_vertices()
+    parent = serializable_creatures[offspring.parent]
+    while parent is not None:
+        # The raw vertices tell most ancestors apart without building their genome
+        if parent['vertices'] == vertices and Genome.from_data(parent) == genome:
+            genome = genome.mutate(offspring.size, rng)
+            vertices = genome.get_vertices()
+            offspring.vertices, offspring.edges = vertices, genome.get_edges()
+        elif parent.get('parent') is None:
             break
-        if parent['vertices'] == offspring.vertices and parent['edges'] == offspring.edges:
-            offspring = change_structure(offspring)
         else:
-            if 'parent' not in parent:
-                break
-            if parent['parent'] is None:
-                break
-            parent_id = parent['parent']
-            parent = serializable_creatures[parent_id]
+            parent = serializable_creatures[parent['parent']]
 
     return offspring
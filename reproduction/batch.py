@@ -0,0 +1,193 @@
+''' Module to create the offsprings of a whole population in one vectorised pass '''
+import random
+
+import numpy as np
+
+from creature import Creature
+from creature.genome import get_bit_edges, get_edge_mask
+from settings import (
+    MAX_VERTICES_COUNT, MAX_EDGE_CHANGE_COUNT, MAX_VERTICES_PIXEL_CHANGE, MAX_REPRODUCTION_ATTEMPTS)
+
+# Every possible edge in the bit order of Genome, an edge set is a boolean mask over these pairs
+PAIRS = np.array(get_bit_edges(MAX_VERTICES_COUNT), dtype=np.int64)
+PAIR_TUPLES = [tuple(pair) for pair in PAIRS.tolist()]
+PAIR_INDEX = {pair: i for i, pair in enumerate(PAIR_TUPLES)}
+CHAIN = PAIRS[:, 0] + 1 == PAIRS[:, 1]
+EDGE_BITS = np.left_shift(1, np.arange(len(PAIRS)), dtype=np.int64)
+
+# Multiplier of the 64 bit genome keys and constants of the splitmix64 finaliser that spreads them
+KEY_MASK = (1 << 64) - 1
+KEY_MULTIPLIER = 0x100000001B3
+KEY_MIXERS = ((30, 0xBF58476D1CE4E5B9), (27, 0x94D049BB133111EB))
+
+
+def encode_vertices(vertices_lists):
+    ''' Returns the vertices of genomes as an array, padded with zeros up to MAX_VERTICES_COUNT '''
+    vertices = np.zeros((len(vertices_lists), MAX_VERTICES_COUNT, 2), dtype=np.int16)
+    for i, genome_vertices in enumerate(vertices_lists):
+        vertices[i, :len(genome_vertices)] = genome_vertices
+    return vertices
+
+
+def encode_edge_orders(edges_lists):
+    ''' Returns the pair indices of the edges of genomes in their order, padded with -1. The
+    order matters since the fitness follows the last edge '''
+    orders = np.full((len(edges_lists), len(PAIRS)), -1, dtype=np.int8)
+    for i, edges in enumerate(edges_lists):
+        orders[i, :len(edges)] = [PAIR_INDEX[tuple(sorted(edge))] for edge in edges]
+    return orders
+
+
+def get_edge_masks(orders):
+    ''' Returns the edge masks of padded pair indices '''
+    masks = np.zeros(orders.shape, dtype=bool)
+    rows, columns = np.nonzero(orders >= 0)
+    masks[rows, orders[rows, columns]] = True
+    return masks
+
+
+def get_edge_orders(masks):
+    ''' Returns the padded pair indices of edge masks, in the bit order of Genome '''
+    orders = np.sort(np.where(masks, np.arange(len(PAIRS)), len(PAIRS)), axis=1)
+    return np.where(orders < len(PAIRS), orders, -1).astype(np.int8)
+
+
+def decode_vertices(vertices, n):
+    ''' Returns the vertices list of an encoded genome '''
+    return [tuple(vertex) for vertex in vertices[:n].tolist()]
+
+
+def decode_edges(order):
+    ''' Returns the edges list of padded pair indices '''
+    return [PAIR_TUPLES[i] for i in order.tolist() if i >= 0]
+
+
+def encode_genomes(n, size, genomes):
+    ''' Returns arrays of the vertex counts, sizes and (vertices, edges) genomes of creatures '''
+    return {
+        'n': np.array(n, dtype=np.int64),
+        'size': np.array(size, dtype=np.int64),
+        'vertices': encode_vertices([vertices for vertices, _ in genomes]),
+        'edges': get_edge_masks(encode_edge_orders([edges for _, edges in genomes])),
+    }
+
+
+def encode_population(creatures):
+    ''' Returns the genomes of some creatures as arrays '''
+    return encode_genomes([creature.n for creature in creatures],
+                          [creature.size for creature in creatures],
+                          [(creature.vertices, creature.edges) for creature in creatures])
+
+
+def decode_genome(arrays, i):
+    ''' Returns the vertices and edges lists of a genome of the arrays '''
+    vertices = decode_vertices(arrays['vertices'][i], arrays['n'][i])
+    edges = [PAIR_TUPLES[j] for j in np.flatnonzero(arrays['edges'][i]).tolist()]
+    return vertices, edges
+
+
+def get_genome_key(vertices, edges):
+    ''' Returns a 64 bit key of a genome that does not depend on the order of the edges, it is
+    the key that get_genome_keys gives to the same genome in arrays '''
+    key = len(vertices)
+    values = [value for vertex in vertices for value in vertex]
+    for value in values + [0] * (2 * MAX_VERTICES_COUNT - len(values)):
+        key = (key * KEY_MULTIPLIER & KEY_MASK) ^ int(value)
+    key = (key * KEY_MULTIPLIER & KEY_MASK) ^ get_edge_mask(edges)
+    for shift, multiplier in KEY_MIXERS:
+        key = (key ^ key >> shift) * multiplier & KEY_MASK
+    key ^= key >> 31
+    return key - (1 << 64) if key >> 63 else key
+
+
+def get_genome_keys(arrays):
+    ''' Returns the 64 bit keys of the genomes of arrays, like get_genome_key '''
+    multiplier = np.uint64(KEY_MULTIPLIER)
+    keys = arrays['n'].astype(np.uint64)
+    for values in arrays['vertices'].reshape(len(keys), -1).T:
+        keys = keys * multiplier ^ values.astype(np.uint64)
+    keys = keys * multiplier ^ (arrays['edges'] @ EDGE_BITS).astype(np.uint64)
+    for shift, mixer in KEY_MIXERS:
+        keys = (keys ^ keys >> np.uint64(shift)) * np.uint64(mixer)
+    return (keys ^ keys >> np.uint64(31)).view(np.int64)
+
+
+def mutate_population(arrays, generator):
+    ''' Returns mutated copies of the genomes with the semantics of change_structure, edges are
+    either added or removed and the first vertex is moved '''
+    count = len(arrays['n'])
+    edges = arrays['edges'].copy()
+    valid = PAIRS[:, 1] < arrays['n'][:, None]
+    addable = valid & ~edges
+    removable = edges & ~CHAIN
+
+    # Adds when there is nothing to remove and removes when there is nothing to add
+    add = generator.random(count) < 0.5
+    add = np.where(addable.any(axis=1), add, False)
+    add = np.where(removable.any(axis=1), add, True)
+    candidates = np.where(add[:, None], addable, removable)
+
+    # Picks up to changes random candidates of each genome
+    changes = generator.integers(1, MAX_EDGE_CHANGE_COUNT + 1, size=count)
+    keys = np.where(candidates, generator.random(candidates.shape, dtype=np.float32), np.inf)
+    limits = np.sort(keys, axis=1)[np.arange(count), np.minimum(changes, len(PAIRS)) - 1]
+    edges ^= candidates & (keys <= limits[:, None])
+
+    vertices = arrays['vertices'].copy()
+    steps = generator.integers(1, MAX_VERTICES_PIXEL_CHANGE + 1, size=(count, 2))
+    signs = generator.integers(0, 2, size=(count, 2))*2 - 1
+    vertices[:, 0] = np.clip(vertices[:, 0] + steps * signs, 0, arrays['size'][:, None] - 1)
+    return dict(arrays, edges=edges, vertices=vertices)
+
+
+def mutate_rows(arrays, rows, generator):
+    ''' Mutates some rows of the arrays in place '''
+    mutated = mutate_population({name: values[rows] for name, values in arrays.items()}, generator)
+    for name, values in mutated.items():
+        arrays[name][rows] = values
+
+
+def find_copies(arrays, originals, rows):
+    ''' Returns the rows whose genome is the same in the arrays and in the originals, the padding
+    of the vertices never changes so whole rows are compared '''
+    vertices = arrays['vertices'][rows] == originals['vertices'][rows]
+    edges = arrays['edges'][rows] == originals['edges'][rows]
+    return rows[vertices.all(axis=(1, 2)) & edges.all(axis=1)]
+
+
+def breed(parents, offsprings, rng=random, genomes=None, attempts=MAX_REPRODUCTION_ATTEMPTS):
+    ''' Returns the arrays of offsprings of every parent of the arrays, ordered by parent. The
+    offsprings that repeat a genome of the index are mutated again up to attempts times, then
+    like reproduce they are only mutated until they differ from their parent '''
+    repeated = {name: np.repeat(values, offsprings, axis=0) for name, values in parents.items()}
+    arrays = {name: values.copy() for name, values in repeated.items()}
+    generator = np.random.default_rng(rng.getrandbits(64))
+    pending = np.arange(len(arrays['n']))
+    # The first round mutates every offspring
+    for _ in range(attempts + 1):
+        if not len(pending):
+            break
+        mutate_rows(arrays, pending, generator)
+        if genomes is None:
+            break
+        keys = get_genome_keys({name: values[pending] for name, values in arrays.items()})
+        pending = pending[genomes.has_genomes(keys)]
+
+    same = find_copies(arrays, repeated, np.arange(len(arrays['n'])))
+    while len(same):
+        mutate_rows(arrays, same, generator)
+        same = find_copies(arrays, repeated, same)
+    return arrays
+
+
+def reproduce_population(creatures, offsprings, rng=random, genomes=None,
+                         attempts=MAX_REPRODUCTION_ATTEMPTS):
+    ''' Creates offsprings of every creature, ordered by parent '''
+    arrays = breed(encode_population(creatures), offsprings, rng, genomes, attempts)
+    population = []
+    for i in range(len(arrays['n'])):
+        parent = creatures[i // offsprings]
+        vertices, edges = decode_genome(arrays, i)
+        population.append(Creature(n=parent.n, size=parent.size, vertices=vertices, edges=edges,
+                                   parent=parent.identity))
+    return population
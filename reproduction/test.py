@@ -1,9 +1,18 @@
 "Module to perform unittest"
+import random
 import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
 from creature import Creature
+from settings import MAX_EDGE_CHANGE_COUNT, MAX_VERTICES_PIXEL_CHANGE
 from file import load_generations
 
-from . import reproduce
+from . import reproduce, get_genome_key, GenomeIndex
+from .batch import (
+    encode_population, mutate_population, reproduce_population, breed, find_copies,
+    get_genome_keys, CHAIN, PAIRS)
 
 
 class TestCases(unittest.TestCase):
@@ -24,6 +33,93 @@ class TestCases(unittest.TestCase):
             offspring = reproduce(creature, data['creatures'])
             offspring.draw_creature()
 
+    def test_seeded_reproduction(self):
+        ''' Tests that the same seed gives the same offsprings '''
+        data = load_generations('test_data/default.pickle')
+        offsprings = []
+        for _ in range(2):
+            rng = random.Random(7)
+            offsprings.append([])
+            for creature in data['generations'][-1]:
+                creature = Creature(**data['creatures'][creature])
+                offspring = reproduce(creature, data['creatures'], rng)
+                offsprings[-1].append((offspring.vertices, offspring.edges))
+        self.assertEqual(offsprings[0], offsprings[1])
+
+    def test_genome_index(self):
+        ''' Tests that offsprings never repeat an indexed genome '''
+        self.assertEqual(get_genome_key([(0, 0), (1, 1), (2, 0)], [(0, 1), (1, 2)]),
+                         get_genome_key([[0, 0], [1, 1], [2, 0]], [[1, 2], [0, 1]]))
+        data = load_generations('test_data/default.pickle')
+        genomes = GenomeIndex(data['creatures'].values())
+        size = len(genomes)
+        creatures = [Creature(**data) for data in data['creatures'].values()]
+        keys = get_genome_keys(encode_population(creatures))
+        self.assertEqual(keys.tolist(), [get_genome_key(c.vertices, c.edges) for c in creatures])
+        self.assertTrue(genomes.has_genomes(keys).all())
+        self.assertFalse(GenomeIndex().has_genomes(keys).any())
+        rng = random.Random(3)
+        for creature in data['generations'][-1]:
+            creature = Creature(**data['creatures'][creature])
+            self.assertIn(creature, genomes)
+            offspring = reproduce(creature, data['creatures'], rng, genomes)
+            self.assertNotIn(offspring, genomes)
+        self.assertEqual(len(genomes), size)
+
+        # An index that holds every genome still gives an offspring unlike its ancestors
+        genomes = MagicMock()
+        genomes.__contains__.return_value = True
+        creature = Creature(**data['creatures'][data['generations'][-1][0]])
+        offspring = reproduce(creature, data['creatures'], rng, genomes, attempts=5)
+        self.assertNotEqual((offspring.vertices, offspring.edges),
+                            (creature.vertices, creature.edges))
+
+    def test_mutate_population(self):
+        ''' Tests that the batch mutation keeps the bounds and the chain edges '''
+        rng = random.Random(5)
+        creatures = [Creature(n=rng.randint(4, 7), size=7, rng=rng) for _ in range(300)]
+        arrays = encode_population(creatures)
+        mutated = mutate_population(arrays, np.random.default_rng(5))
+        changes = np.abs(mutated['edges'].sum(axis=1) - arrays['edges'].sum(axis=1))
+        self.assertTrue(((changes >= 1) & (changes <= MAX_EDGE_CHANGE_COUNT)).all())
+        chain = CHAIN & (PAIRS[:, 1] < arrays['n'][:, None])
+        self.assertTrue(mutated['edges'][chain].all())
+        self.assertFalse((mutated['edges'] & (PAIRS[:, 1] >= arrays['n'][:, None])).any())
+        moves = np.abs(mutated['vertices'][:, 0] - arrays['vertices'][:, 0])
+        self.assertTrue((moves <= MAX_VERTICES_PIXEL_CHANGE).all())
+        self.assertTrue((mutated['vertices'][:, 1:] == arrays['vertices'][:, 1:]).all())
+
+    def test_reproduce_population(self):
+        ''' Tests that the batch offsprings are ordered by parent and avoid indexed genomes '''
+        data = load_generations('test_data/default.pickle')
+        creatures = [Creature(**data['creatures'][i]) for i in data['generations'][-1]]
+        genomes = GenomeIndex(data['creatures'].values())
+        offsprings = reproduce_population(creatures, 2, random.Random(2), genomes)
+        self.assertEqual([o.parent for o in offsprings],
+                         [c.identity for c in creatures for _ in range(2)])
+        for offspring in offsprings:
+            self.assertNotIn(offspring, genomes)
+
+        # The offsprings that still repeat a genome after the last round only differ from their
+        # parent
+        genomes = MagicMock()
+        genomes.has_genomes.side_effect = lambda keys: np.ones(len(keys), dtype=bool)
+        offsprings = reproduce_population(creatures, 2, random.Random(2), genomes, attempts=3)
+        self.assertEqual(len(offsprings), 2 * len(creatures))
+        self.assertEqual(genomes.has_genomes.call_count, 4)
+        for i, offspring in enumerate(offsprings):
+            self.assertNotEqual(get_genome_key(offspring.vertices, offspring.edges),
+                                get_genome_key(creatures[i // 2].vertices, creatures[i // 2].edges))
+
+        # An offspring that mutates back into its parent is mutated again
+        arrays = encode_population(creatures[:1])
+        rng = MagicMock()
+        rng.getrandbits.return_value = 0
+        with patch('reproduction.batch.mutate_population',
+                   side_effect=[dict(arrays), mutate_population(arrays, np.random.default_rng(0))]):
+            offspring = breed(arrays, 1, rng)
+        self.assertEqual(len(find_copies(offspring, arrays, np.arange(1))), 0)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,110 @@
+''' Module to select the creatures that survive to the next generation '''
+import random
+
+import numpy as np
+
+from settings import K_COUNT, SELECTION
+
+# Added to the shifted fitness so that the weakest creature can still be selected
+MIN_WEIGHT = 1e-9
+
+
+def get_generator(rng=random):
+    ''' Returns a numpy generator seeded from a random generator '''
+    return np.random.default_rng(rng.getrandbits(64))
+
+
+def get_weights(fitness):
+    ''' Returns positive weights that keep the order of the fitness values '''
+    return fitness - fitness.min() + MIN_WEIGHT
+
+
+def select_distinct(draw, size, count):
+    ''' Calls draw with the indices of the remaining creatures and the number of picks that are
+    still needed, until count distinct creatures are picked '''
+    remaining = np.arange(size)
+    selected = []
+    needed = count
+    while needed > 0:
+        picks = remaining[draw(remaining, needed)]
+        # Keeps the first pick of a creature that is picked more than once
+        _, first = np.unique(picks, return_index=True)
+        picks = picks[np.sort(first)][:needed]
+        selected.append(picks)
+        remaining = np.setdiff1d(remaining, picks, assume_unique=True)
+        needed -= len(picks)
+    return np.concatenate(selected) if selected else np.empty(0, dtype=np.int64)
+
+
+def select_weighted(weights, count, generator):
+    ''' Samples count distinct indices with probabilities proportional to the weights '''
+    keys = np.log(generator.random(len(weights))) / weights
+    picks = np.argpartition(-keys, count - 1)[:count] if count else np.empty(0, dtype=np.int64)
+    return picks[np.argsort(-keys[picks])]
+
+
+def tournament_selection(fitness, count, rng=random, k=K_COUNT):
+    ''' Selects the winners of tournaments of k creatures that are drawn from the creatures that
+    are not selected yet '''
+    generator = get_generator(rng)
+
+    def draw(remaining, needed):
+        entrants = generator.integers(len(remaining), size=(needed, k))
+        return entrants[np.arange(needed), np.argmax(fitness[remaining][entrants], axis=1)]
+
+    return select_distinct(draw, len(fitness), count)
+
+
+def rank_selection(fitness, count, rng=random):
+    ''' Selects creatures with probabilities proportional to their rank '''
+    ranks = np.empty(len(fitness))
+    ranks[np.argsort(fitness, kind='stable')] = np.arange(1, len(fitness) + 1)
+    return select_weighted(ranks, count, get_generator(rng))
+
+
+def roulette_selection(fitness, count, rng=random):
+    ''' Selects creatures with probabilities proportional to their shifted fitness '''
+    return select_weighted(get_weights(fitness), count, get_generator(rng))
+
+
+def sus_selection(fitness, count, rng=random):
+    ''' Stochastic universal sampling, evenly spaced pointers over the cumulative shifted fitness
+    of the creatures that are not selected yet '''
+    generator = get_generator(rng)
+    weights = get_weights(fitness)
+
+    def draw(remaining, needed):
+        total = np.cumsum(weights[remaining])
+        step = total[-1] / needed
+        pointers = generator.random() * step + step * np.arange(needed)
+        return np.minimum(np.searchsorted(total, pointers, side='right'), len(remaining) - 1)
+
+    return select_distinct(draw, len(fitness), count)
+
+
+def truncation_selection(fitness, count, rng=random):  # pylint: disable=unused-argument
+    ''' Selects the count fittest creatures '''
+    if count == 0:
+        return np.empty(0, dtype=np.int64)
+    picks = np.argpartition(-fitness, count - 1)[:count]
+    return picks[np.argsort(-fitness[picks], kind='stable')]
+
+
+SCHEMES = {
+    'tournament': tournament_selection,
+    'rank': rank_selection,
+    'roulette': roulette_selection,
+    'sus': sus_selection,
+    'truncation': truncation_selection,
+}
+
+
+def select(fitness, count, scheme=SELECTION, rng=random, k=K_COUNT):
+    ''' Returns the indices of count distinct creatures selected by a scheme, k is the size of
+    the tournaments '''
+    fitness = np.asarray(fitness, dtype=np.float64)
+    if count > len(fitness):
+        raise ValueError(f'Cannot select {count} of {len(fitness)} creatures')
+    if scheme == 'tournament':
+        return tournament_selection(fitness, count, rng, k)
+    return SCHEMES[scheme](fitness, count, rng)
@@ -0,0 +1,33 @@
+"Module to perform unittest"
+import random
+import unittest
+
+import numpy as np
+
+from . import select, SCHEMES
+
+
+class SelectionTestCase(unittest.TestCase):
+    "Class that contains test cases for selection package"
+
+    def test_distinct_selection(self):
+        ''' Tests that every scheme selects distinct creatures reproducibly '''
+        fitness = np.random.default_rng(0).normal(50, 20, 500)
+        for scheme in SCHEMES:
+            selected = select(fitness, 200, scheme, random.Random(1))
+            self.assertEqual(len(set(selected.tolist())), 200)
+            self.assertTrue(np.array_equal(selected, select(fitness, 200, scheme,
+                                                            random.Random(1))))
+            # Every scheme favours the fitter creatures
+            self.assertGreater(fitness[selected].mean(), fitness.mean())
+
+    def test_truncation_selection(self):
+        ''' Tests that truncation selects the fittest creatures in order '''
+        fitness = [3.0, -1.0, 7.0, 5.0, 0.0]
+        self.assertEqual(select(fitness, 3, 'truncation').tolist(), [2, 3, 0])
+        self.assertEqual(select(fitness, 5, 'tournament', random.Random(0)).size, 5)
+        self.assertRaises(ValueError, select, fitness, 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
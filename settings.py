@@ -1,10 +1,14 @@
 ''' Stores the configuration of the program '''
+import os
 
 # Reproduction
 # Max number of edges that added and removed
 MAX_EDGE_CHANGE_COUNT = 3
 MAX_VERTICES_PIXEL_CHANGE = 2
 MAX_SIZE = 7
+# Times an offspring is mutated again while it repeats a genome of the index, after that it only
+# has to differ from its ancestors
+MAX_REPRODUCTION_ATTEMPTS = 100
 
 # Creature
 MIN_VERTICES_COUNT = 4
@@ -13,13 +17,18 @@ DENSITY = 3
 FRICTION = 0.8
 
 # Training
-# Note:
-# POPULATION_SIZE = SELECTION_SIZE * REPRODUCTION_PER_SELECTION_SIZE + RANDOM_NEW_POPULATION_SIZE
+# Note: the selected creatures are kept next to their offsprings, so POPULATION_SIZE =
+# SELECTION_SIZE * (OFFSPRINGS_PER_SELECTION_SIZE + 1) + RANDOM_NEW_POPULATION_SIZE
 POPULATION_SIZE = 500
 SELECTION_SIZE = 200
 OFFSPRINGS_PER_SELECTION_SIZE = 1
 RANDOM_NEW_POPULATION_SIZE = 100
 
+# Selection
+# Scheme that selects the SELECTION_SIZE survivors of a generation, one of 'tournament', 'rank',
+# 'roulette', 'sus' and 'truncation'
+SELECTION = 'tournament'
+
 # Tournament Selection
 # Note: K_COUNT must be lower than POPULATION_SIZE
 # More information on
@@ -31,10 +40,89 @@ STEP_LIMIT = 15 * 60  # step count, 60 steps = 1 sec
 MOTOR_SPEED = 200
 MAX_MOTOR_TORQUE = 200
 
+# Framework
+# JSON file of rendering framework settings, it overrides the defaults of framework/settings.py
+# and is overridden by the command line options of main.py
+FRAMEWORK_CONFIG = 'data/framework.json'
+
+# Fidelity profiles
+# Physics settings of the simulation and the environment, STEP_LIMIT and the other step counts
+# are given at 60 hz and scaled to the hz of the profile
+FIDELITY = 'default'
+FIDELITY_PROFILES = {
+    'screening': {'hz': 30.0, 'velocity_iterations': 4, 'position_iterations': 2,
+                  'continuous': False, 'sub_stepping': False},
+    'default': {'hz': 60.0, 'velocity_iterations': 8, 'position_iterations': 3,
+                'continuous': True, 'sub_stepping': False},
+    'precise': {'hz': 120.0, 'velocity_iterations': 16, 'position_iterations': 6,
+                'continuous': True, 'sub_stepping': True},
+}
+
+# Simulation
+# Number of worker processes used to simulate the population, 1 simulates in a single world
+WORKERS = 1
+# 'shared' simulates all the creatures in one world, 'isolated' gives each creature its own world
+SIMULATION_MODE = 'shared'
+
+# Fitness cache
+# Shared by the cli and the gui, stores at most FITNESS_CACHE_SIZE genomes
+FITNESS_CACHE_PATH = 'data/fitness_cache.pickle'
+FITNESS_CACHE_SIZE = 1000000
+# New entries are appended to the file, which is rewritten without the stale entries once it holds
+# FITNESS_CACHE_COMPACTION times FITNESS_CACHE_SIZE entries
+FITNESS_CACHE_COMPACTION = 2
+
+# Checkpoints
+# 'log' appends the generations to a log file, 'sqlite' inserts them into a lineage database
+STORAGE = 'log'
+# Number of generation checkpoints that can wait for the background writer
+CHECKPOINT_QUEUE_SIZE = 2
+
+# Retention
+# Every COMPACTION_INTERVAL generations the creatures that are neither part of the last
+# RETENTION_GENERATIONS generations nor ancestors of the live creatures are dropped from memory,
+# they stay in the saved generations. None keeps every creature
+RETENTION_GENERATIONS = 20
+COMPACTION_INTERVAL = 10
+
+# Racing
+# At each checkpoint step the creatures that stalled since the last checkpoint, or that cannot
+# reach the selection cutoff at RACING_SPEED_MARGIN times the fastest average speed, are frozen
+RACING = False
+RACING_CHECKPOINTS = (2 * 60, 5 * 60, 10 * 60)
+RACING_SPEED_MARGIN = 2.0
+RACING_STALL_DISTANCE = 0.05
+
+# Multi-fidelity
+# The random new creatures are first simulated for SCREENING_STEP_LIMIT steps with the
+# SCREENING_FIDELITY profile, only the ones above the SCREENING_PERCENTILE of the screened fitness
+# get the full simulation and the others keep thier screened fitness scaled to STEP_LIMIT
+MULTI_FIDELITY = False
+SCREENING_STEP_LIMIT = 3 * 60
+SCREENING_FIDELITY = 'default'
+SCREENING_PERCENTILE = 75
+
+# Rest detection
+# Every REST_INTERVAL steps the creatures whose bodies are all asleep, or whose position stayed
+# within REST_DISTANCE over the last REST_WINDOW steps, are frozen
+REST_DETECTION = True
+REST_INTERVAL = 10
+REST_WINDOW = 3 * 60
+REST_DISTANCE = 0.01
 
-# For small training size
-# POPULATION_SIZE = 50
-# SELECTION_SIZE = 20
-# OFFSPRINGS_PER_SELECTION_SIZE = 1
-# RANDOM_NEW_POPULATION_SIZE = 10
-# K_COUNT = 5
+# Run presets
+# Settings of a run that override the lowercase names of the settings above, see the config
+# package for the settings that a run can change
+RUN_PRESETS = {
+    'default': {},
+    # For small training size
+    'small': {'population_size': 50, 'selection_size': 20, 'offsprings_per_selection_size': 1,
+              'random_new_population_size': 10, 'k_count': 5},
+    # For throughput on large populations, every core simulates worlds of single creatures, the
+    # creatures at rest are frozen early and the random new creatures are screened first. Racing
+    # stays off since a world of a single creature has no selection cutoff
+    'large': {'population_size': 50000, 'selection_size': 20000,
+              'offsprings_per_selection_size': 1, 'random_new_population_size': 10000,
+              'simulation_mode': 'isolated', 'workers': os.cpu_count() or 1,
+              'rest_detection': True, 'multi_fidelity': True},
+}
@@ -1,35 +1,52 @@
 ''' Moudule for simulating physics without gui '''
-from timeit import timeit
+from multiprocessing import get_context
+from timeit import default_timer, timeit
 
-from Box2D import b2World, b2PolygonShape, b2FixtureDef, b2EdgeShape
+import numpy as np
+
+from Box2D import b2World, b2EdgeShape, b2RevoluteJointDef
 from tqdm import tqdm
 
+from cache import get_cache_key
 from creature import Creature, find_adjacent_edges
 from file import load_generations
-from maths.maths import line_to_rectangle
-from settings import DENSITY, FRICTION, MOTOR_SPEED, MAX_MOTOR_TORQUE, STEP_LIMIT
+from simulation.fixtures import get_fixture
+from settings import (
+    DENSITY, FRICTION, MOTOR_SPEED, MAX_MOTOR_TORQUE, STEP_LIMIT, WORKERS, SELECTION_SIZE,
+    SIMULATION_MODE,
+    RACING, RACING_CHECKPOINTS, RACING_SPEED_MARGIN, RACING_STALL_DISTANCE,
+    REST_DETECTION, REST_INTERVAL, REST_WINDOW, REST_DISTANCE, FIDELITY, FIDELITY_PROFILES,
+    SCREENING_PERCENTILE)
 
 
-TIME_STEP = 1.0/60
-VEL_ITERS, POS_ITERS = 8, 3
 THICKNESS = 0.5
+PHYSICS = (THICKNESS, DENSITY, FRICTION, MOTOR_SPEED, MAX_MOTOR_TORQUE)
+RACING_SETTINGS = (RACING_CHECKPOINTS, RACING_SPEED_MARGIN, RACING_STALL_DISTANCE)
+REST_SETTINGS = (REST_INTERVAL, REST_WINDOW, REST_DISTANCE)
+
+_WORKER_SIMULATION = None
+
 
+def create_joint_def(motor_speed=MOTOR_SPEED, max_motor_torque=MAX_MOTOR_TORQUE):
+    ''' Returns a motor joint definition that is reused for all the joints '''
+    return b2RevoluteJointDef(
+        collideConnected=True,
+        motorSpeed=motor_speed,
+        maxMotorTorque=max_motor_torque,
+        enableMotor=True,
+    )
 
-def create_creature_bodies(world, creatures):
+
+def create_creature_bodies(world, creatures, creature_bodies=None, physics=PHYSICS):
     ''' Creates a list of creature bodies and returns reference bodies '''
+    thickness, density, friction, motor_speed, max_motor_torque = physics
     reference_body = {}
+    joint = create_joint_def(motor_speed, max_motor_torque)
     for creature in creatures:
         body = {}
         for edge in creature.edges:
             vertex = creature.vertices[edge[0]], creature.vertices[edge[1]]
-            point = line_to_rectangle(*vertex, THICKNESS)
-
-            fixture = b2FixtureDef(
-                shape=b2PolygonShape(vertices=point),
-                density=DENSITY,
-                friction=FRICTION,
-            )
-            fixture.filter.groupIndex = -1
+            fixture = get_fixture(*vertex, thickness, density, friction)
             body[tuple(edge)] = world.CreateDynamicBody(
                 fixtures=fixture,
             )
@@ -38,64 +55,400 @@ def create_creature_bodies(world, creatures):
             adjacent = find_adjacent_edges(edge, creature.edges)
             for a_edge in adjacent:
                 anchor = int(creature.vertices[edge[0]][0]), int(creature.vertices[edge[0]][1])
-                world.CreateRevoluteJoint(
-                    bodyA=body[tuple(edge)],
-                    bodyB=body[tuple(a_edge)],
-                    anchor=anchor,
-                    collideConnected=True,
-                    motorSpeed=MOTOR_SPEED,
-                    maxMotorTorque=MAX_MOTOR_TORQUE,
-                    enableMotor=True,
-                )
+                # New bodies are at the origin, so the local anchors equal the world anchor
+                joint.bodyA = body[tuple(edge)]
+                joint.bodyB = body[tuple(a_edge)]
+                joint.localAnchorA = anchor
+                joint.localAnchorB = anchor
+                world.CreateJoint(joint)
         reference_body[creature.identity] = body[tuple(edge)]
+        if creature_bodies is not None:
+            creature_bodies[creature.identity] = list(body.values())
     return reference_body
 
 
+def get_step_count(steps, fidelity=FIDELITY):
+    ''' Converts a step count at 60 hz to the step count of a fidelity profile '''
+    return max(1, round(steps * FIDELITY_PROFILES[fidelity]['hz'] / 60))
+
+
+def get_top_identities(fitness, size=SELECTION_SIZE):
+    ''' Returns the identities of the size fittest creatures '''
+    return set(sorted(fitness, key=fitness.get, reverse=True)[:size])
+
+
+def create_stats():
+    ''' Returns empty statistics of a simulation '''
+    return {'steps': 0, 'body_steps_saved': 0, 'estimated': set()}
+
+
+def merge_stats(stats, other):
+    ''' Adds the statistics of other to stats '''
+    stats['steps'] = max(stats['steps'], other['steps'])
+    stats['body_steps_saved'] += other['body_steps_saved']
+    stats['estimated'] |= other['estimated']
+
+
+def simulate_multi_fidelity(simulation, screening, creatures, candidates, builder=None,
+                            percentile=SCREENING_PERCENTILE):
+    ''' Screens the candidates with a short simulation and fully simulates the other creatures
+    and the promoted candidates above the percentile of the screened fitness, returns the fitness
+    and the statistics of the tiers. The screened fitness of a rejected candidate is scaled to
+    the duration of the full simulation, as if it kept its average speed '''
+    start = default_timer()
+    screened = screening.simulate(candidates, builder) if candidates else {}
+    screening_time = default_timer() - start
+
+    promoted = set()
+    if screened:
+        threshold = np.percentile(list(screened.values()), percentile)
+        promoted = {identity for identity, fitness in screened.items() if fitness > threshold}
+    full = [c for c in creatures if c.identity not in screened or c.identity in promoted]
+
+    start = default_timer()
+    fitness = simulation.simulate(full, builder)
+    full_time = default_timer() - start
+    duration_ratio = simulation.duration / screening.duration
+    for identity, value in screened.items():
+        if identity not in promoted:
+            fitness[identity] = value * duration_ratio
+
+    rejected = len(screened) - len(promoted)
+    # Estimated from the screening time, assuming the cost grows linearly with the steps
+    saved = 0
+    if screened:
+        step_ratio = simulation.step_limit / screening.step_limit
+        saved = screening_time * step_ratio * rejected / len(screened) - screening_time
+    tiers = {
+        'screened': len(screened),
+        'promoted': len(promoted),
+        'full': len(full),
+        'screening_time': screening_time,
+        'full_time': full_time,
+        'time_saved': saved,
+    }
+    return fitness, tiers
+
+
+def find_mismatches(creatures, workers, mode=SIMULATION_MODE):
+    ''' Simulates the creatures serially and in parallel and returns the identities whose
+    fitness is not bit-identical '''
+    serial = Simulation(1, None, mode).simulate(creatures)
+    simulation = Simulation(workers, None, mode)
+    parallel = simulation.simulate(creatures)
+    simulation.close()
+    return [identity for identity, fitness in serial.items() if parallel[identity] != fitness]
+
+
+def split_shards(creatures, count):
+    ''' Splits the creatures into count shards of nearly equal size '''
+    return [shard for shard in (creatures[i::count] for i in range(count)) if shard]
+
+
+def init_worker(mode, racing, rest_detection, fidelity, step_limit, physics, selection_size,
+                racing_settings, rest_settings):
+    ''' Creates the world of a worker process '''
+    global _WORKER_SIMULATION  # pylint: disable=global-statement
+    _WORKER_SIMULATION = Simulation(1, None, mode, racing, rest_detection, fidelity, step_limit,
+                                    physics, selection_size, racing_settings, rest_settings)
+
+
+def simulate_shard(shard):
+    ''' Simulates a shard of creature data in the world of the worker process '''
+    creatures = [Creature(**data) for data in shard]
+    _WORKER_SIMULATION.stats = create_stats()
+    fitness = _WORKER_SIMULATION.simulate_local(creatures, show_progress=False)
+    return fitness, _WORKER_SIMULATION.stats
+
+
 class Simulation:
     ''' Class that handles simulation of the world '''
 
-    def __init__(self):
-        self.world = b2World()
+    def __init__(self, workers=WORKERS, cache=None, mode=SIMULATION_MODE, racing=RACING,
+                 rest_detection=REST_DETECTION, fidelity=FIDELITY, step_limit=STEP_LIMIT,
+                 physics=PHYSICS, selection_size=SELECTION_SIZE, racing_settings=RACING_SETTINGS,
+                 rest_settings=REST_SETTINGS):
+        self.fidelity = fidelity
+        self.profile = FIDELITY_PROFILES[fidelity]
+        # Step count at 60 hz, the step limit is scaled to the hz of the profile
+        self.duration = step_limit
+        self.step_limit = get_step_count(step_limit, fidelity)
+        self.world = None
+        self.floor = None
+        self.reset_world()
+        self.workers = workers
+        self.cache = cache
+        self.mode = mode
+        self.racing = racing
+        self.rest_detection = rest_detection
+        self.physics = tuple(physics)
+        self.selection_size = selection_size
+        checkpoints, self.racing_speed_margin, self.racing_stall_distance = racing_settings
+        self.racing_checkpoints = tuple(checkpoints)
+        self.rest_interval, self.rest_window, self.rest_distance = rest_settings
+        self.pool = None
+        self.stats = create_stats()
+
+    @classmethod
+    def from_config(cls, config, cache=None, screening=False):
+        ''' Returns the simulation of the settings of a run, or the screening simulation of its
+        multi-fidelity '''
+        if screening:
+            fidelity, step_limit = config.screening_fidelity, config.screening_step_limit
+        else:
+            fidelity, step_limit = config.fidelity, config.step_limit
+        physics = (THICKNESS, config.density, config.friction, config.motor_speed,
+                   config.max_motor_torque)
+        racing_settings = (config.racing_checkpoints, config.racing_speed_margin,
+                           config.racing_stall_distance)
+        rest_settings = (config.rest_interval, config.rest_window, config.rest_distance)
+        return cls(config.workers, cache, config.simulation_mode, config.racing,
+                   config.rest_detection, fidelity, step_limit, physics, config.selection_size,
+                   racing_settings, rest_settings)
+
+    def reset_world(self):
+        ''' Replaces the world with an empty one that only has the floor '''
+        # Dropping the whole world is cheaper than destroying the bodies one by one
+        self.world = b2World(gravity=(0, -10), doSleep=True)
+        self.world.continuousPhysics = self.profile['continuous']
+        self.world.subStepping = self.profile['sub_stepping']
         self.floor = self.world.CreateBody(shapes=b2EdgeShape(vertices=[(-1000, -1), (1000, -1)]))
 
+    def get_physics(self):
+        ''' Returns the settings that decide the fitness of a creature '''
+        return self.physics + tuple(sorted(self.profile.items())) + (self.step_limit, self.mode)
+
+    def get_racing_settings(self):
+        ''' Returns the checkpoints, the speed margin and the stall distance of racing '''
+        return self.racing_checkpoints, self.racing_speed_margin, self.racing_stall_distance
+
+    def get_rest_settings(self):
+        ''' Returns the interval, the window and the distance of rest detection '''
+        return self.rest_interval, self.rest_window, self.rest_distance
+
+    def step(self):
+        ''' Steps the world once with the fidelity profile '''
+        self.world.Step(1.0 / self.profile['hz'], self.profile['velocity_iterations'],
+                        self.profile['position_iterations'])
+
+    def set_workers(self, workers):
+        ''' Changes the number of worker processes used by simulate '''
+        if workers != self.workers:
+            self.close()
+            self.workers = workers
+
+    def get_pool(self):
+        ''' Returns the worker pool, starting it on first use '''
+        if self.pool is None:
+            self.pool = get_context('spawn').Pool(
+                self.workers, initializer=init_worker,
+                initargs=(self.mode, self.racing, self.rest_detection, self.fidelity,
+                          self.duration, self.physics, self.selection_size,
+                          self.get_racing_settings(), self.get_rest_settings()))
+        return self.pool
+
+    def close(self):
+        ''' Stops the worker processes '''
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
     def simulate(self, creatures, builder=None):
         ''' Simulates a bunch of creatures and returns thier fitness without gui '''
-        uncompleted = list(filter(lambda c: c.fitness == 0.0, creatures))
+        self.stats = create_stats()
+        if self.cache is None:
+            uncompleted = list(filter(lambda c: c.fitness == 0.0, creatures))
+            fitness = self.simulate_uncompleted(uncompleted, builder)
+        else:
+            fitness = self.simulate_cached(creatures, builder)
+
+        output = {}
+        for creature in creatures:
+            output[creature.identity] = fitness.get(creature.identity, creature.fitness)
+        return output
+
+    def simulate_cached(self, creatures, builder=None):
+        ''' Simulates each distinct genome missing from the cache only once '''
+        keys = {}
+        values = {}
+        uncompleted = {}
+        for creature in creatures:
+            key = get_cache_key(creature.vertices, creature.edges, self.get_physics())
+            keys[creature.identity] = key
+            if key in values or key in uncompleted:
+                continue
+            fitness = self.cache.get(key)
+            if fitness is None:
+                uncompleted[key] = creature
+            else:
+                values[key] = fitness
+
+        fitness = self.simulate_uncompleted(list(uncompleted.values()), builder)
+        for key, creature in uncompleted.items():
+            values[key] = fitness[creature.identity]
+            if creature.identity not in self.stats['estimated']:
+                self.cache.put(key, values[key])
+
+        output = {}
+        for identity, key in keys.items():
+            output[identity] = values[key]
+        return output
+
+    def simulate_uncompleted(self, creatures, builder=None):
+        ''' Simulates the creatures in the worker processes or in the world '''
+        if self.workers > 1 and len(creatures) > 1:
+            return self.simulate_parallel(creatures, builder)
+        return self.simulate_local(creatures, builder)
+
+    def simulate_local(self, creatures, builder=None, show_progress=True):
+        ''' Simulates the creatures in this process according to the mode '''
+        if self.mode == 'isolated':
+            return self.simulate_individually(creatures, builder, show_progress)
+        return self.simulate_world(creatures, builder, show_progress)
+
+    def simulate_parallel(self, creatures, builder=None):
+        ''' Simulates shards of the creatures in the worker processes and merges the fitness '''
+        # Isolated creatures are handed out one by one to balance the load of the workers
+        count = len(creatures) if self.mode == 'isolated' else self.workers
+        shards = split_shards([creature.get_data() for creature in creatures], count)
+        pbar = None
         if builder is None:
-            pbar = tqdm(total=STEP_LIMIT, ncols=100)
-        bodies = create_creature_bodies(self.world, uncompleted)
-        for i in range(STEP_LIMIT):
+            pbar = tqdm(total=len(shards), ncols=100)
+        output = {}
+        results = self.get_pool().imap_unordered(simulate_shard, shards)
+        for i, (fitness, stats) in enumerate(results):
+            output.update(fitness)
+            merge_stats(self.stats, stats)
             if builder is not None:
-                progress = i * 100 // STEP_LIMIT
-                builder.get_object('progress')['value'] = progress
+                builder.get_object('progress')['value'] = (i + 1) * 100 // len(shards)
             else:
                 pbar.update(1)
-            self.world.Step(TIME_STEP, VEL_ITERS, POS_ITERS)
-        if builder is None:
+        if pbar is not None:
+            pbar.close()
+        return output
+
+    def simulate_world(self, creatures, builder=None, show_progress=True):
+        ''' Simulates the creatures together in the world and returns thier fitness '''
+        pbar = None
+        if builder is None and show_progress:
+            pbar = tqdm(total=self.step_limit, ncols=100)
+        creature_bodies = {}
+        bodies = create_creature_bodies(self.world, creatures, creature_bodies, self.physics)
+        frozen = {}
+        checkpoints = {}
+        history = {}
+        racing_checkpoints = {get_step_count(step, self.fidelity)
+                              for step in self.racing_checkpoints}
+        rest_interval = get_step_count(self.rest_interval, self.fidelity)
+        for i in range(self.step_limit):
+            if builder is not None:
+                progress = i * 100 // self.step_limit
+                builder.get_object('progress')['value'] = progress
+            elif pbar is not None:
+                pbar.update(1)
+            self.step()
+            self.stats['steps'] = max(self.stats['steps'], i + 1)
+            if self.racing and i + 1 in racing_checkpoints:
+                self.race(i + 1, bodies, creature_bodies, frozen, checkpoints)
+            if self.rest_detection and (i + 1) % rest_interval == 0:
+                self.rest(i + 1, bodies, creature_bodies, frozen, history)
+            if len(frozen) == len(bodies):
+                break
+        if pbar is not None:
             pbar.close()
 
         output = {}
         for creature in creatures:
-            if creature in uncompleted:
-                output[creature.identity] = bodies[creature.identity].position[0]
+            if creature.identity in frozen:
+                output[creature.identity] = frozen[creature.identity]
             else:
-                output[creature.identity] = creature.fitness
-        for body in self.world.bodies:
-            if body != self.floor:
-                self.world.DestroyBody(body)
-        self.world.ClearForces()
+                output[creature.identity] = bodies[creature.identity].position[0]
+        self.reset_world()
         return output
 
-    def simulate_individually(self, creatures):
-        ''' Simulates a bunch of creatures individually and returns thier fitness without gui '''
-        pbar = tqdm(total=len(creatures), ncols=100)
-        output = {}
-        for creature in creatures:
-            body = create_creature_bodies(self.world, [creature])[creature.identity]
-            for _ in range(STEP_LIMIT):
-                self.world.Step(TIME_STEP, VEL_ITERS, POS_ITERS)
-            output[creature.identity] = body.position[0]
+    def freeze(self, identity, step, bodies, creature_bodies, frozen):
+        ''' Keeps the current fitness of a creature and removes its bodies from the world '''
+        frozen[identity] = bodies[identity].position[0]
+        for body in creature_bodies[identity]:
             self.world.DestroyBody(body)
-            pbar.update()
-        pbar.close()
+        self.stats['body_steps_saved'] += len(creature_bodies[identity]) * (self.step_limit - step)
+
+    def race(self, step, bodies, creature_bodies, frozen, checkpoints):
+        ''' Freezes the creatures that stalled or cannot reach the selection cutoff. The cutoff
+        is the fitness of the selection_size fittest creature of this world, so only the shared
+        mode has one. A shard of the parallel simulation has a lower cutoff than the whole
+        population and freezes fewer creatures, the isolated mode only freezes the stalled ones '''
+        positions = {}
+        for identity, body in bodies.items():
+            if identity not in frozen:
+                positions[identity] = body.position[0]
+        if not positions:
+            return
+
+        # The fastest average speed so far bounds how far a creature can still go
+        fitness = {**frozen, **positions}
+        cutoff = None
+        if len(fitness) > self.selection_size:
+            cutoff = sorted(fitness.values(), reverse=True)[self.selection_size - 1]
+        speed = max(0.0, max(positions.values()) / step) * self.racing_speed_margin
+        reach = speed * (self.step_limit - step)
+
+        for identity, position in positions.items():
+            stalled = (identity in checkpoints and
+                       abs(position - checkpoints[identity]) < self.racing_stall_distance)
+            hopeless = cutoff is not None and position + reach < cutoff
+            if stalled or hopeless:
+                self.freeze(identity, step, bodies, creature_bodies, frozen)
+                self.stats['estimated'].add(identity)
+            else:
+                checkpoints[identity] = position
+
+    def rest(self, step, bodies, creature_bodies, frozen, history):
+        ''' Freezes the creatures that are asleep or stayed in place over the window '''
+        samples = self.rest_window // self.rest_interval
+        for identity, body in bodies.items():
+            if identity in frozen:
+                continue
+            if not any(b.awake for b in creature_bodies[identity]):
+                # Nothing wakes up a sleeping creature again, so its fitness is exact
+                self.freeze(identity, step, bodies, creature_bodies, frozen)
+                continue
+
+            positions = history.setdefault(identity, [])
+            positions.append(body.position[0])
+            if len(positions) < samples:
+                continue
+            del positions[:-samples]
+            if max(positions) - min(positions) < self.rest_distance:
+                self.freeze(identity, step, bodies, creature_bodies, frozen)
+                self.stats['estimated'].add(identity)
+
+    def check_racing(self, creatures):
+        ''' Returns whether racing keeps the fittest creatures of a full simulation in the
+        mode of the simulation, the creatures are simulated in this process '''
+        racing, rest_detection = self.racing, self.rest_detection
+        self.racing, self.rest_detection = False, False
+        full = self.simulate_local(creatures, show_progress=False)
+        self.racing = True
+        self.stats = create_stats()
+        raced = self.simulate_local(creatures, show_progress=False)
+        self.racing, self.rest_detection = racing, rest_detection
+        size = self.selection_size
+        return get_top_identities(full, size) == get_top_identities(raced, size)
+
+    def simulate_individually(self, creatures, builder=None, show_progress=True):
+        ''' Simulates each creature alone in an empty world and returns thier fitness '''
+        pbar = None
+        if builder is None and show_progress:
+            pbar = tqdm(total=len(creatures), ncols=100)
+        output = {}
+        for i, creature in enumerate(creatures):
+            output.update(self.simulate_world([creature], show_progress=False))
+            if builder is not None:
+                builder.get_object('progress')['value'] = (i + 1) * 100 // len(creatures)
+            elif pbar is not None:
+                pbar.update(1)
+        if pbar is not None:
+            pbar.close()
         return output
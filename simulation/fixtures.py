@@ -0,0 +1,40 @@
+''' Module for the precomputed fixtures of the edges of the grid '''
+from functools import lru_cache
+from itertools import product
+
+from Box2D import b2FixtureDef, b2PolygonShape
+
+from maths.maths import line_to_rectangle
+from settings import MAX_SIZE
+
+
+def create_fixture(start, end, thickness, density, friction):
+    ''' Creates the fixture of a single edge '''
+    fixture = b2FixtureDef(
+        shape=b2PolygonShape(vertices=line_to_rectangle(start, end, thickness)),
+        density=density,
+        friction=friction,
+    )
+    fixture.filter.groupIndex = -1
+    return fixture
+
+
+@lru_cache(maxsize=None)
+def get_fixture_table(thickness, density, friction, size=MAX_SIZE):
+    ''' Returns the fixtures of every edge between two points of the grid '''
+    points = list(product(range(size), repeat=2))
+    table = {}
+    for start in points:
+        for end in points:
+            table[(start, end)] = create_fixture(start, end, thickness, density, friction)
+    return table
+
+
+def get_fixture(start, end, thickness, density, friction):
+    ''' Returns the reusable fixture of an edge, creating it once if it is outside the grid '''
+    start, end = tuple(start), tuple(end)
+    table = get_fixture_table(thickness, density, friction)
+    fixture = table.get((start, end))
+    if fixture is None:
+        fixture = table[(start, end)] = create_fixture(start, end, thickness, density, friction)
+    return fixture
@@ -1,11 +1,36 @@
 "Module to perform unittest"
+import os
+import subprocess
+import sys
+import tempfile
 import unittest
 from timeit import timeit
 
+from cache import FitnessCache
+
 from creature import Creature
 from file import load_generations
 
-from . import Simulation
+from maths.maths import line_to_rectangle
+from settings import MAX_SIZE
+from . import Simulation, simulate_multi_fidelity
+from .fixtures import get_fixture, get_fixture_table
+
+# Modules that only the gui needs
+GUI_MODULES = {'tkinter', 'cv2', 'pygame', 'matplotlib', 'PIL', 'easygui', 'pygubu'}
+# Seconds to import everything that cui.py needs
+IMPORT_TIME_BUDGET = 2.0
+
+
+def load_creatures(count=None):
+    ''' Returns the creatures of the last test generation with thier fitness cleared '''
+    data = load_generations('test_data/default.pickle')
+    creatures = []
+    for creature in data['generations'][-1][:count]:
+        creature = Creature(**data['creatures'][creature])
+        creature.fitness = 0.0
+        creatures.append(creature)
+    return creatures
 
 
 class SimulationTestCase(unittest.TestCase):
@@ -23,6 +48,135 @@ class SimulationTestCase(unittest.TestCase):
         simulation = Simulation()
         print(timeit(lambda: print(simulation.simulate(creatures)), number=1))
 
+    def test_simulate_parallel(self):
+        ''' Tests that the parallel simulation matches the single world simulation '''
+        creatures = load_creatures()
+        serial = Simulation(workers=1).simulate(creatures)
+        simulation = Simulation(workers=4)
+        parallel = simulation.simulate(creatures)
+        simulation.close()
+
+        # The creatures of a world do not collide, so a shard gives the same fitness
+        self.assertEqual(serial, parallel)
+
+    def test_simulate_cached(self):
+        ''' Tests that a cached genome is not simulated again '''
+        creatures = load_creatures(10)
+        with tempfile.TemporaryDirectory() as directory:
+            cache = FitnessCache(os.path.join(directory, 'cache.pickle'))
+            simulation = Simulation(workers=1, cache=cache)
+            first = simulation.simulate(creatures)
+            self.assertEqual(cache.misses, len(creatures))
+
+            twin = Creature(**creatures[0].get_data())
+            twin.identity = -1
+            second = simulation.simulate(creatures + [twin])
+            self.assertEqual(cache.misses, len(creatures))
+            self.assertEqual(cache.hits, len(creatures))
+            self.assertEqual(second[-1], first[creatures[0].identity])
+            for creature in creatures:
+                self.assertEqual(first[creature.identity], second[creature.identity])
+
+    def test_fixture_table(self):
+        ''' Tests that the fixtures of the grid edges are precomputed and reused '''
+        table = get_fixture_table(0.5, 3, 0.8)
+        self.assertEqual(len(table), MAX_SIZE ** 4)
+        fixture = get_fixture([1, 2], [4, 6], 0.5, 3, 0.8)
+        self.assertIs(fixture, table[((1, 2), (4, 6))])
+        fixture = get_fixture((20, 1), (4, 6), 0.5, 3, 0.8)
+        self.assertIs(fixture, get_fixture((20, 1), (4, 6), 0.5, 3, 0.8))
+        fixture = table[((1, 2), (4, 6))]
+        expected = sorted(line_to_rectangle((1, 2), (4, 6), 0.5))
+        for vertex, point in zip(sorted(fixture.shape.vertices), expected):
+            self.assertAlmostEqual(vertex[0], point[0], places=5)
+            self.assertAlmostEqual(vertex[1], point[1], places=5)
+
+    def test_racing(self):
+        ''' Tests that racing saves body steps and keeps the fittest creatures '''
+        creatures = load_creatures()
+        simulation = Simulation(workers=1, racing=True)
+        simulation.selection_size = 20
+        self.assertTrue(simulation.check_racing(creatures))
+        self.assertGreater(simulation.stats['body_steps_saved'], 0)
+        self.assertTrue(simulation.stats['estimated'])
+        self.assertLessEqual(simulation.stats['steps'], simulation.step_limit)
+
+        # Alone in its world a creature has no cutoff, so only the stalled ones are frozen
+        simulation = Simulation(workers=1, mode='isolated', racing=True)
+        simulation.selection_size = 20
+        self.assertTrue(simulation.check_racing(creatures))
+        self.assertGreater(simulation.stats['body_steps_saved'], 0)
+
+    def test_rest_detection(self):
+        ''' Tests that freezing creatures at rest barely changes thier fitness '''
+        creatures = load_creatures()
+        full = Simulation(workers=1, rest_detection=False).simulate(creatures)
+        simulation = Simulation(workers=1, rest_detection=True)
+        rested = simulation.simulate(creatures)
+        self.assertGreater(simulation.stats['body_steps_saved'], 0)
+        self.assertLessEqual(simulation.stats['estimated'], set(full))
+        for identity, fitness in full.items():
+            self.assertAlmostEqual(fitness, rested[identity], places=1)
+
+    def test_simulate_isolated(self):
+        ''' Tests that isolated fitness does not depend on the order or the workers '''
+        creatures = load_creatures()
+        simulation = Simulation(workers=1, mode='isolated')
+        serial = simulation.simulate(creatures)
+        self.assertEqual(serial, simulation.simulate(creatures[::-1]))
+        for identity, fitness in simulation.simulate(creatures[len(creatures)//2:]).items():
+            self.assertEqual(serial[identity], fitness)
+
+        simulation = Simulation(workers=4, mode='isolated')
+        parallel = simulation.simulate(creatures)
+        simulation.close()
+        self.assertEqual(serial, parallel)
+
+    def test_multi_fidelity(self):
+        ''' Tests that only the promoted candidates get the full simulation '''
+        creatures = load_creatures()
+        candidates = creatures[:20]
+        simulation = Simulation(workers=1, mode='isolated')
+        screening = Simulation(workers=1, mode='isolated', step_limit=60)
+        fitness, tiers = simulate_multi_fidelity(simulation, screening, creatures, candidates)
+        full = simulation.simulate(creatures)
+        screened = screening.simulate(candidates)
+
+        self.assertEqual(tiers['screened'], 20)
+        self.assertEqual(tiers['promoted'], 5)
+        self.assertEqual(tiers['full'], 35)
+        ratio = simulation.duration / screening.duration
+        rejected = []
+        for creature in creatures:
+            if creature in candidates and fitness[creature.identity] != full[creature.identity]:
+                rejected.append(creature.identity)
+                self.assertEqual(fitness[creature.identity], screened[creature.identity] * ratio)
+            else:
+                self.assertEqual(fitness[creature.identity], full[creature.identity])
+
+        # Scaling to the full duration keeps the screened order of the rejected candidates
+        self.assertEqual(len(rejected), 15)
+        self.assertEqual(sorted(rejected, key=fitness.get), sorted(rejected, key=screened.get))
+        promoted = [c.identity for c in candidates if c.identity not in rejected]
+        self.assertLess(max(screened[i] for i in rejected), min(screened[i] for i in promoted))
+
+    def test_headless_import(self):
+        ''' Tests that the cli imports no gui module and stays within the import time budget '''
+        result = subprocess.run([sys.executable, '-X', 'importtime', 'cui.py', '--help'],
+                                capture_output=True, text=True, check=True)
+        total = 0
+        modules = set()
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = line.split('|')
+            modules.add(name.strip().split('.')[0])
+            # Top level imports include the time of the modules that they import
+            if not name.startswith('  '):
+                total += int(cumulative)
+        self.assertFalse(modules & GUI_MODULES)
+        self.assertLess(total / 1e6, IMPORT_TIME_BUDGET)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -3,6 +3,6 @@ from datetime import datetime
 from settings import POPULATION_SIZE
 
 
-def get_default_name():
+def get_default_name(population_size=POPULATION_SIZE):
     ''' Returns a default name value '''
-    return f'P{POPULATION_SIZE}_{datetime.now().strftime("%m-%d-%YT%H-%M")}'
+    return f'P{population_size}_{datetime.now().strftime("%m-%d-%YT%H-%M")}'